@@ -0,0 +1,254 @@
+"""Airtel access tokens (OAuth2 client credentials).
+
+One TokenManager per process hands the current token to every request
+without blocking: a background thread fetches a new one REFRESH_MARGIN
+seconds before the old one expires. Refreshes are single-flight (one fetch
+however many threads notice a stale token), and with AIRTEL_TOKEN_CACHE=file
+the token is shared by all workers on the host through a locked file, so a
+gunicorn deployment fetches one token per expiry rather than one per worker.
+
+Requests only wait on a fetch for the very first token, after a failed
+refresh has let the token lapse, or when Airtel rejects a token with 401
+(AirtelClient then refreshes once and retries).
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: file cache works, without cross-process locking
+    fcntl = None
+
+TOKEN_PATH = os.getenv('AIRTEL_TOKEN_PATH', 'auth/oauth2/token')
+# refresh this long before expiry; Airtel tokens typically live 180 s
+REFRESH_MARGIN = float(os.getenv('AIRTEL_TOKEN_REFRESH_MARGIN', '30'))
+TOKEN_TIMEOUT = (3.05, 10)
+RETRY_MIN = 1.0
+RETRY_MAX = 30.0
+
+Token = namedtuple('Token', 'value issued_at expires_at')  # times from time.time()
+
+
+class TokenError(Exception):
+    """The token endpoint refused or failed to issue a token."""
+
+
+class MemoryCache:
+    """Token held by this process only."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._token = None
+
+    def load(self):
+        return self._token
+
+    def store(self, token):
+        self._token = token
+
+    def locked(self):
+        return _NullLock()
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FileCache:
+    """Token shared by the workers on one host.
+
+    `locked()` holds an exclusive flock across "re-read, fetch, store", so
+    when several workers see the token go stale only the first fetches and
+    the rest pick up its result.
+    """
+
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock_path = path + '.lock'
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            return Token(raw['access_token'], float(raw['issued_at']), float(raw['expires_at']))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def store(self, token):
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'access_token': token.value, 'issued_at': token.issued_at,
+                       'expires_at': token.expires_at}, f)
+        os.replace(tmp, self.path)
+
+    def locked(self):
+        return _FileLock(self._lock_path)
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+        return False
+
+
+class TokenManager:
+    def __init__(self, token_url, client_id, client_secret, cache=None, session=None,
+                 refresh_margin=REFRESH_MARGIN, timeout=TOKEN_TIMEOUT):
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.cache = cache or MemoryCache()
+        self.session = session or requests.Session()
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.fetches = 0
+        self._token = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._closed = False
+
+    def get(self):
+        """Current token value; only blocks when there is no usable token."""
+        if self._pid != os.getpid():
+            self._start_refresher()
+        token = self._token
+        if token is None or token.expires_at <= time.time():
+            token = self.refresh(stale=token and token.value)
+        return token.value
+
+    def refresh(self, stale=None):
+        """Replace the `stale` token value with a fresh token (single-flight).
+
+        Returns the new Token. If another thread or worker already replaced
+        it, that token is returned without fetching again.
+        """
+        with self._lock:
+            if self._token is not None and self._token.value != stale and self._fresh(self._token):
+                return self._token
+            with self.cache.locked():
+                shared = self.cache.load()
+                if shared is not None and shared.value != stale and self._fresh(shared):
+                    token = shared
+                else:
+                    token = self._fetch()
+                    self.cache.store(token)
+            self._token = token
+        self._wake.set()
+        return token
+
+    def close(self):
+        """Stop background refreshes (the cached token stays usable)."""
+        self._closed = True
+        self._wake.set()
+
+    def _refresh_at(self, token):
+        # short-lived tokens are refreshed halfway through instead
+        margin = min(self.refresh_margin, (token.expires_at - token.issued_at) / 2)
+        return token.expires_at - margin
+
+    def _fresh(self, token):
+        return self._refresh_at(token) > time.time()
+
+    def _fetch(self):
+        self.fetches += 1
+        body = {'client_id': self.client_id, 'client_secret': self.client_secret,
+                'grant_type': 'client_credentials'}
+        try:
+            r = self.session.post(self.token_url, json=body, timeout=self.timeout,
+                                  headers={'Content-Type': 'application/json', 'Accept': '*/*'})
+        except requests.exceptions.RequestException as e:
+            raise TokenError(f'Airtel token request failed: {e}') from e
+        if r.status_code != 200:
+            raise TokenError(f'Airtel token request returned {r.status_code}: {r.text[:200]}')
+        try:
+            data = r.json()
+            now = time.time()
+            return Token(data['access_token'], now, now + float(data.get('expires_in') or 180))
+        except (ValueError, KeyError, TypeError) as e:
+            raise TokenError(f'Airtel token response malformed: {e}') from e
+
+    def _start_refresher(self):
+        # started lazily so each forked worker gets its own thread
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._refresh_loop, name='airtel-token', daemon=True).start()
+
+    def _refresh_loop(self):
+        retry = RETRY_MIN
+        while not self._closed:
+            token = self._token
+            if token is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            wait = self._refresh_at(token) - time.time()
+            if wait > 0:
+                # woken early when a request refreshes on its own (first token, 401)
+                if self._wake.wait(wait):
+                    self._wake.clear()
+                    continue
+            try:
+                self.refresh(stale=token.value)
+                retry = RETRY_MIN
+            except Exception as e:
+                print(f"[WARNING] Airtel token refresh failed, retrying in {retry:.0f}s: {e}")
+                time.sleep(random.uniform(retry / 2, retry))
+                retry = min(RETRY_MAX, retry * 2)
+
+
+def create_cache():
+    kind = os.getenv('AIRTEL_TOKEN_CACHE', 'memory')
+    if kind == 'file':
+        path = os.getenv('AIRTEL_TOKEN_CACHE_FILE') or os.path.join(
+            tempfile.gettempdir(), f'airtel-token-{os.getenv("AIRTEL_CLIENT_ID", "")[:12]}')
+        return FileCache(path)
+    return MemoryCache()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_manager():
+    """Process-wide TokenManager from AIRTEL_CLIENT_ID/SECRET, or None if unset."""
+    global _default
+    client_id = os.getenv('AIRTEL_CLIENT_ID')
+    client_secret = os.getenv('AIRTEL_CLIENT_SECRET')
+    if not (client_id and client_secret):
+        return None
+    with _default_lock:
+        if _default is None:
+            base = os.getenv('AIRTEL_BASE_URL', 'https://openapiuat.airtel.mw')
+            _default = TokenManager(f"{base.rstrip('/')}/{TOKEN_PATH.lstrip('/')}", client_id, client_secret,
+                                    cache=create_cache())
+        return _default
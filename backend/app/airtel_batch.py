@@ -0,0 +1,132 @@
+"""Batched Airtel payments and refunds.
+
+A batch fans out over AsyncAirtelClient with at most `concurrency` calls in
+flight and at most `rate` calls per second per partner (Airtel throttles per
+partner code), and reports a result per item in input order. One failing
+item never fails the batch.
+
+The partner buckets live at module level, so concurrent batches in one
+process share each partner's rate. The limit is per process: with N
+workers (or hosts) sending batches, Airtel sees up to N times the rate.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from .airtel_client import AirtelUnavailable
+
+# batch() runs the whole batch inside the calling request thread (asyncio.run
+# blocks until every item is done), so this also bounds how long one admin
+# request ties up a worker: about BATCH_MAX_ITEMS / PARTNER_RATE seconds
+BATCH_MAX_ITEMS = int(os.getenv('AIRTEL_BATCH_MAX_ITEMS', '1000'))
+BATCH_CONCURRENCY = int(os.getenv('AIRTEL_BATCH_CONCURRENCY', '16'))
+# calls per second allowed per partner code
+PARTNER_RATE = float(os.getenv('AIRTEL_PARTNER_RATE', '50'))
+
+OPERATIONS = {'payment': 'create_payment', 'refund': 'refund_payment'}
+
+
+class RateLimiter:
+    """Token bucket: `rate` calls per second, bursts up to `burst`.
+
+    Thread-safe and not tied to an event loop, so batches running on
+    different threads (each under its own asyncio.run) can share one.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; returns how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # a negative balance queues callers behind each other
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(partner, rate=PARTNER_RATE):
+    """The process-wide bucket for `partner` (replaced if `rate` changes)."""
+    with _limiters_lock:
+        limiter = _limiters.get(partner)
+        if limiter is None or limiter.rate != rate:
+            limiter = _limiters[partner] = RateLimiter(rate)
+        return limiter
+
+
+def _result(index, resp):
+    try:
+        body = resp.json()
+    except Exception:
+        body = {'raw': resp.text}
+    return {'index': index, 'ok': resp.status_code < 400, 'status_code': resp.status_code, 'response': body}
+
+
+async def run_batch(client, operation, items, concurrency=BATCH_CONCURRENCY, rate=PARTNER_RATE):
+    """Run `operation` for each {'partner', 'payload'} item; returns results in input order."""
+    call = getattr(client, OPERATIONS[operation])
+    gate = asyncio.Semaphore(min(concurrency, client.concurrency))
+
+    async def one(index, item):
+        limiter = limiter_for(item.get('partner') or 'default', rate)
+        # wait on the partner's bucket before taking a slot, so a throttled
+        # partner doesn't hold slots other partners could use
+        await limiter.acquire()
+        async with gate:
+            try:
+                return _result(index, await call(item['payload']))
+            except AirtelUnavailable as e:
+                return {'index': index, 'ok': False, 'error': str(e), 'retryable': True}
+            except Exception as e:
+                return {'index': index, 'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+    return await asyncio.gather(*(one(i, item) for i, item in enumerate(items)))
+
+
+def parse_items(raw):
+    """Validate batch items: a list of payloads or of {'partner', 'payload'}; raises ValueError."""
+    if not isinstance(raw, list) or not raw:
+        raise ValueError('items must be a non-empty list')
+    if len(raw) > BATCH_MAX_ITEMS:
+        raise ValueError(f'at most {BATCH_MAX_ITEMS} items per batch')
+    items = []
+    for it in raw:
+        if not isinstance(it, dict):
+            raise ValueError('each item must be an object')
+        if 'payload' in it:
+            if not isinstance(it['payload'], dict) or not it['payload']:
+                raise ValueError('item payload must be a non-empty object')
+            items.append({'partner': it.get('partner'), 'payload': it['payload']})
+        else:
+            items.append({'partner': None, 'payload': it})
+    return items
+
+
+def batch(client, operation, items, concurrency=BATCH_CONCURRENCY, rate=PARTNER_RATE):
+    """Synchronous entry point (for Flask views and scripts)."""
+    start = time.perf_counter()
+    results = asyncio.run(run_batch(client, operation, items, concurrency, rate))
+    succeeded = sum(1 for r in results if r['ok'])
+    return {
+        'operation': operation,
+        'results': results,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -1,49 +1,223 @@
+"""Airtel Money merchant API client.
+
+One client (and one pooled requests.Session) is shared by every request
+thread, so calls reuse keep-alive connections instead of paying a TCP + TLS
+handshake each time. Calls have separate connect/read timeouts; idempotent
+ones are retried with jittered exponential backoff, and a circuit breaker
+fails fast while Airtel is down instead of tying up worker threads.
+
+With AIRTEL_CLIENT_ID/AIRTEL_CLIENT_SECRET set, access tokens come from the
+process-wide airtel_auth.TokenManager and a 401 triggers one refresh and
+retry; otherwise the static AIRTEL_BEARER_TOKEN is sent.
+
+AsyncAirtelClient is the asyncio front end used for batches (see
+airtel_batch.py).
+
+scripts/airtel_stub.py is a local fake of these endpoints for benchmarks.
+"""
+import asyncio
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from . import airtel_auth
+
+CONNECT_TIMEOUT = float(os.getenv('AIRTEL_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('AIRTEL_READ_TIMEOUT', '30'))
+# keep-alive connections per process; size it to the threads calling Airtel
+POOL_SIZE = int(os.getenv('AIRTEL_POOL_SIZE', '10'))
+MAX_RETRIES = int(os.getenv('AIRTEL_MAX_RETRIES', '2'))
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+# consecutive failures that open the breaker, and how long it stays open
+BREAKER_FAILURES = int(os.getenv('AIRTEL_BREAKER_FAILURES', '5'))
+BREAKER_RESET = float(os.getenv('AIRTEL_BREAKER_RESET', '30'))
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class AirtelUnavailable(Exception):
+    """Airtel is failing; the circuit breaker is rejecting calls for now."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one trial call)."""
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_after=BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._count = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_after:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_after or self._trial:
+                return False
+            self._trial = True  # let exactly one call probe the service
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._count = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._count += 1
+            if self._trial or self._count >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+def _never_sent(exc):
+    """True if the connection was never established, so nothing reached Airtel."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(reason, ConnectTimeoutError)  # includes NewConnectionError (refused, DNS)
+
+
+def build_session(pool_size=POOL_SIZE):
+    session = requests.Session()
+    # retries are handled in AirtelClient._request, which knows what is safe to repeat
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 class AirtelClient:
-    def __init__(self):
+    def __init__(self, session=None, breaker=None, max_retries=MAX_RETRIES,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), tokens=None):
         # Default to Airtel staging root; the client composes the API prefix below
         self.base = os.getenv('AIRTEL_BASE_URL', 'https://openapiuat.airtel.mw')
         # API prefix (path) used by the merchant collection APIs
         self.api_prefix = os.getenv('AIRTEL_API_PREFIX', 'merchant-collection/v1').strip('/')
         self.token = os.getenv('AIRTEL_BEARER_TOKEN')
+        self.tokens = tokens or airtel_auth.default_manager()
         self.country = os.getenv('AIRTEL_COUNTRY', 'MW')
         self.currency = os.getenv('AIRTEL_CURRENCY', 'MWK')
+        self.session = session or build_session()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.timeout = timeout
 
-    def _headers(self):
+    def _headers(self, token=None):
         h = {
             'x-country': self.country,
             'x-currency': self.currency,
             'Content-Type': 'application/json',
             'Accept': 'application/json',
         }
-        if self.token:
-            h['Authorization'] = f'Bearer {self.token}'
+        token = token or self.token
+        if token:
+            h['Authorization'] = f'Bearer {token}'
         return h
 
     def _url(self, path: str) -> str:
         return f"{self.base.rstrip('/')}/{self.api_prefix}/{path.lstrip('/')}"
 
+    def _request(self, method, path, idempotent, **kwargs):
+        """Send a request through the breaker, retrying what is safe to retry.
+
+        Non-idempotent calls are only retried when the connection was never
+        established (nothing reached Airtel); idempotent ones also on read
+        timeouts, dropped connections and 429/502/503/504. With managed
+        tokens a 401 refreshes the token and is retried once whatever the
+        method, since Airtel rejected the call without acting on it.
+        """
+        url = self._url(path)
+        attempt = 0
+        reauthed = False
+        while True:
+            if not self.breaker.allow():
+                raise AirtelUnavailable('Airtel API unavailable (circuit open)')
+            try:
+                # inside the try: a failed token fetch must count against (and
+                # release) the breaker like any other failed call
+                token = self.tokens.get() if self.tokens else None
+                r = self.session.request(method, url, headers=self._headers(token), timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.breaker.record_failure()
+                retryable, error = idempotent or _never_sent(e), e
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                if r.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if r.status_code == 401 and self.tokens and not reauthed:
+                    reauthed = True
+                    self.tokens.refresh(stale=token)
+                    continue
+                if not (idempotent and r.status_code in RETRY_STATUSES) or attempt >= self.max_retries:
+                    return r
+                retryable, error = True, None
+            if not retryable or attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+            time.sleep(random.uniform(0, delay))
 
     def register_merchants(self, merchants):
-        url = self._url('merchant')
         payload = {'merchants': merchants}
-        r = requests.post(url, json=payload, headers=self._headers(), timeout=30)
-        return r
+        return self._request('POST', 'merchant', idempotent=False, json=payload)
 
     def fetch_merchants(self):
-        url = self._url('fetch')
-        r = requests.get(url, headers=self._headers(), timeout=30)
-        return r
+        return self._request('GET', 'fetch', idempotent=True)
 
     def create_payment(self, payload):
-        url = self._url('payments')
-        r = requests.post(url, json=payload, headers=self._headers(), timeout=30)
-        return r
+        return self._request('POST', 'payments', idempotent=False, json=payload)
 
     def refund_payment(self, payload):
-        url = self._url('payments/refund')
-        r = requests.post(url, json=payload, headers=self._headers(), timeout=30)
-        return r
+        return self._request('POST', 'payments/refund', idempotent=False, json=payload)
+
+    def payment_status(self, transaction_id):
+        return self._request('GET', f'payments/{transaction_id}', idempotent=True)
+
+
+class AsyncAirtelClient:
+    """asyncio interface to the Airtel API.
+
+    Calls run on a dedicated thread pool through an AirtelClient with its own
+    connection pool sized to `concurrency`, sharing the circuit breaker of
+    `client`, so retries, timeouts and fail-fast behave exactly as for
+    single calls.
+    """
+
+    def __init__(self, client, concurrency=POOL_SIZE):
+        self.concurrency = concurrency
+        self.client = AirtelClient(session=build_session(concurrency), breaker=client.breaker,
+                                   max_retries=client.max_retries, timeout=client.timeout, tokens=client.tokens)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='airtel')
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def create_payment(self, payload):
+        return await self._call(self.client.create_payment, payload)
+
+    async def refund_payment(self, payload):
+        return await self._call(self.client.refund_payment, payload)
@@ -0,0 +1,314 @@
+"""Airtel payment notifications (POST /api/airtel/notify/<partner>).
+
+The callback handler only parses the payload and appends it to an in-process
+buffer; a flusher thread writes the buffer to `airtel_notifications` in
+batches (every FLUSH_INTERVAL seconds, or as soon as BATCH_SIZE are waiting)
+and applies the resulting order status changes in bulk with
+order_status.apply(), in the same commit. The buffer is flushed on shutdown.
+
+Notifications are keyed by Airtel's transaction id, so redeliveries update
+one row instead of adding another. Our payments use transaction ids of the
+form "order-<order id>[-<suffix>]" (see transaction_id()), which is how a
+notification finds its order.
+
+Callbacks are acknowledged once buffered: a worker killed without a chance
+to flush loses at most the last interval's worth, and those orders stay
+pending until reconciliation (reconcile.py) checks them against Airtel.
+
+Transaction ids are guessable, so only verified callbacks change orders.
+AIRTEL_CALLBACK_PARTNERS lists the partner codes we accept, each with an
+optional shared secret ("CODE:secret,OTHER"); callbacks for any other
+partner are refused. A callback is verified when its X-Callback-Signature
+header is the hex HMAC-SHA256 of the raw body under its partner's secret.
+Anything else is stored unverified, without touching the order, and
+reconciliation confirms the payment with Airtel. AIRTEL_CALLBACK_ALLOW_UNSIGNED=1
+trusts every callback (local testing only).
+"""
+import atexit
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
+
+from . import db, order_status
+from .models import AirtelNotification, Order
+
+BATCH_SIZE = int(os.getenv('AIRTEL_NOTIFY_BATCH', '500'))
+FLUSH_INTERVAL = float(os.getenv('AIRTEL_NOTIFY_FLUSH_INTERVAL', '0.5'))
+# callbacks held while the database is unreachable; beyond this the endpoint
+# answers 503 and Airtel redelivers later
+MAX_PENDING = int(os.getenv('AIRTEL_NOTIFY_MAX_PENDING', '50000'))
+# callbacks that could not be stored even on their own, kept for inspection
+MAX_REJECTED = 1000
+
+
+def _partners(spec):
+    """{partner code: secret or None} from "CODE:secret,OTHER"."""
+    partners = {}
+    for entry in (spec or '').split(','):
+        code, _, secret = entry.strip().partition(':')
+        if code:
+            partners[code] = secret or None
+    return partners
+
+
+CALLBACK_PARTNERS = _partners(os.getenv('AIRTEL_CALLBACK_PARTNERS'))
+ALLOW_UNSIGNED = os.getenv('AIRTEL_CALLBACK_ALLOW_UNSIGNED', '0') == '1'
+
+# Airtel transaction status codes -> order status
+ORDER_STATUS = {'TS': 'completed', 'TF': 'failed'}
+
+_ORDER_TXN = re.compile(r'^order-(\d+)(?:-|$)')
+
+
+def transaction_id(order_id, suffix=None):
+    """Airtel transaction id for a payment of `order_id`."""
+    return f'order-{order_id}' + (f'-{suffix}' if suffix else '')
+
+
+def order_id_for(txn_id):
+    m = _ORDER_TXN.match(txn_id or '')
+    return int(m.group(1)) if m else None
+
+
+def sign(secret, raw):
+    """X-Callback-Signature value for a raw callback body."""
+    return hmac.new(secret.encode('utf-8'), raw.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def verify(partner_code, raw, signature):
+    """'verified', 'unverified', or 'unknown' for a partner we don't accept."""
+    if ALLOW_UNSIGNED:
+        return 'verified'
+    if partner_code not in CALLBACK_PARTNERS:
+        return 'unknown'
+    secret = CALLBACK_PARTNERS[partner_code]
+    if secret and signature and hmac.compare_digest(sign(secret, raw), signature):
+        return 'verified'
+    return 'unverified'
+
+
+def parse(partner_code, data, raw, verified=False):
+    """Row mapping for one callback payload, or None if it has no transaction id."""
+    txn = data.get('transaction') if isinstance(data, dict) else None
+    if not isinstance(txn, dict) or not txn.get('id'):
+        return None
+    txn_id = str(txn['id'])[:64]
+    return {
+        'transaction_id': txn_id,
+        'partner_code': partner_code[:64],
+        'airtel_money_id': str(txn.get('airtel_money_id') or '')[:64] or None,
+        'status_code': str(txn.get('status_code') or '')[:16] or None,
+        'message': str(txn['message']) if txn.get('message') is not None else None,
+        'payload': raw,
+        'order_id': order_id_for(txn_id),
+        'verified': verified,
+        'received_at': datetime.utcnow(),
+    }
+
+
+def write(rows):
+    """Upsert notification rows and apply their order statuses in one commit.
+
+    Later rows for the same transaction replace earlier ones, except that an
+    unverified row never replaces a verified one. Only verified rows change
+    orders. Returns {'inserted', 'updated', 'orders': {status: count}}.
+    """
+    latest = {}
+    for row in rows:
+        prev = latest.get(row['transaction_id'])
+        if prev is None or row['verified'] or not prev['verified']:
+            latest[row['transaction_id']] = row
+    # a transaction id naming an order we don't have is stored unlinked
+    order_ids = {r['order_id'] for r in latest.values() if r['order_id'] is not None}
+    if order_ids:
+        known = {oid for (oid,) in db.session.query(Order.id).filter(Order.id.in_(order_ids))}
+        for r in latest.values():
+            if r['order_id'] is not None and r['order_id'] not in known:
+                r['order_id'] = None
+    existing = dict(
+        db.session.query(AirtelNotification.transaction_id, AirtelNotification.verified)
+        .filter(AirtelNotification.transaction_id.in_(list(latest)))
+    )
+    for txn_id, verified in existing.items():
+        if verified and not latest[txn_id]['verified']:
+            del latest[txn_id]
+    inserts = [r for t, r in latest.items() if t not in existing]
+    updates = [r for t, r in latest.items() if t in existing]
+    if inserts:
+        db.session.bulk_insert_mappings(AirtelNotification, inserts)
+    if updates:
+        db.session.bulk_update_mappings(AirtelNotification, updates)
+    transitions = [(r['order_id'], ORDER_STATUS[r['status_code']]) for r in latest.values()
+                   if r['verified'] and r['order_id'] is not None and r['status_code'] in ORDER_STATUS]
+    applied = order_status.apply(transitions, commit=False)
+    db.session.commit()
+    return {'inserted': len(inserts), 'updated': len(updates), 'orders': applied}
+
+
+class NotificationBuffer:
+    def __init__(self, app, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.stats = {'received': 0, 'written': 0, 'flushes': 0, 'rejected': 0, 'errors': 0, 'dropped': 0}
+        self.dropped = deque(maxlen=MAX_REJECTED)  # (row, error) that no retry will fix
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._closed = False
+        self._failing = False
+
+    def add(self, row):
+        """Queue one row; returns False if the buffer is full."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # started lazily in the serving process (after any pre-fork)
+                self._pid = os.getpid()
+                self._rows.clear()
+                threading.Thread(target=self._run, name='airtel-notify', daemon=True).start()
+            if len(self._rows) >= self.max_pending:
+                self.stats['rejected'] += 1
+                return False
+            self._rows.append(row)
+            self.stats['received'] += 1
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self._wake.set()
+        return True
+
+    def pending(self):
+        return len(self._rows)
+
+    def flush(self):
+        """Write what is buffered now; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            # rows arriving meanwhile wait for the next flush, so batches stay full
+            remaining = len(self._rows)
+            while remaining > 0:
+                with self._lock:
+                    batch = [self._rows.popleft() for _ in range(min(self.batch_size, remaining, len(self._rows)))]
+                if not batch:
+                    break
+                remaining -= len(batch)
+                try:
+                    self._write(batch)
+                    done = len(batch)
+                except _UNAVAILABLE as e:
+                    self._requeue(batch, e)
+                    return written
+                except Exception as e:
+                    print(f"[WARNING] Airtel notification batch failed, writing rows one by one: {e}")
+                    done = self._write_each(batch)
+                    if done is None:
+                        return written
+                self._failing = False
+                written += done
+                with self._lock:
+                    self.stats['written'] += done
+                    self.stats['flushes'] += 1
+        return written
+
+    def _write_each(self, batch):
+        """Write rows singly, setting aside the ones that fail on their own.
+
+        Returns the number written, or None if the database went away (the
+        unwritten rows are back in the buffer).
+        """
+        done = 0
+        for i, row in enumerate(batch):
+            try:
+                self._write([row])
+                done += 1
+            except _UNAVAILABLE as e:
+                self._requeue(batch[i:], e)
+                return None
+            except Exception as e:
+                with self._lock:
+                    self.stats['dropped'] += 1
+                    self.dropped.append((row, f'{type(e).__name__}: {e}'))
+                print(f"[WARNING] Airtel notification {row['transaction_id']} not stored: {e}")
+        return done
+
+    def _requeue(self, rows, error):
+        with self._lock:
+            self._rows.extendleft(reversed(rows))
+            self.stats['errors'] += 1
+        self._failing = True
+        print(f"[WARNING] Airtel notification flush failed, {len(rows)} kept for retry: {error}")
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                write(batch)
+            except IntegrityError:
+                # another worker inserted one of these transactions first; the
+                # retry sees its row and updates it instead
+                db.session.rollback()
+                write(batch)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def close(self):
+        """Stop the flusher and write whatever is still buffered."""
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def _run(self):
+        last = time.monotonic()
+        while not self._closed:
+            self._wake.wait(max(0.0, last + self.interval - time.monotonic()))
+            self._wake.clear()
+            if len(self._rows) < self.batch_size and time.monotonic() - last < self.interval:
+                continue
+            last = time.monotonic()
+            if self._rows:
+                self.flush()
+                if self._failing:
+                    # database trouble: retry once per interval, not on every callback
+                    time.sleep(self.interval)
+
+
+# errors meaning the database is unreachable rather than the rows being bad
+_UNAVAILABLE = (OperationalError, InterfaceError)
+
+_buffer = None
+
+
+def init_app(app):
+    global _buffer
+    _buffer = NotificationBuffer(app)
+    atexit.register(_buffer.close)
+
+
+def receive(partner_code, data, raw, signature=None):
+    """Buffer one callback. Returns 'queued', 'forbidden', 'invalid' or 'full'."""
+    trust = verify(partner_code, raw, signature)
+    if trust == 'unknown':
+        return 'forbidden'
+    row = parse(partner_code, data, raw, verified=trust == 'verified')
+    if row is None:
+        return 'invalid'
+    return 'queued' if _buffer.add(row) else 'full'
+
+
+def flush():
+    return _buffer.flush() if _buffer is not None else 0
+
+
+def stats():
+    return dict(_buffer.stats, pending=_buffer.pending()) if _buffer is not None else {}
@@ -2,58 +2,208 @@ import os
 import random
 import time
 from datetime import datetime
-from flask import Blueprint, jsonify, request, redirect
+import hashlib
+from flask import Blueprint, jsonify, request, redirect, Response
 from flask import send_from_directory, abort
 from werkzeug.utils import secure_filename
-from . import db
+from sqlalchemy.orm import joinedload, selectinload
+from . import db, catalog, catalog_query, changefeed, checkout_sessions, events, jobs, pricing, search, stripe_sync
+from .querycount import query_budget
+from .idempotency import idempotent
 from .models import MenuItem, Category, Order, OrderItem, Subscriber, Customer, Reservation, Promotion
 import stripe
 
-# Explicitly use test mode with test keys
-stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
-# Verify we're in test mode
-if stripe.api_key and stripe.api_key.startswith('sk_test_'):
-    print("[INFO] Using Stripe TEST environment")
-else:
-    print("[WARNING] Not using Stripe test keys!")
-
 # Simple admin secret (dev-only). Configure ADMIN_SECRET in your environment or .env
 ADMIN_SECRET = os.getenv('ADMIN_SECRET', 'dev-secret')
 
+# Cache-Control for catalog responses: clients keep a copy but revalidate it with
+# If-None-Match, so admin changes are visible immediately and cost a 304 otherwise.
+CATALOG_CACHE_CONTROL = os.getenv('CATALOG_CACHE_CONTROL', 'public, no-cache')
+
+# Create Stripe sessions on the job queue (scripts/run_worker.py) instead of
+# inside the request. Set to 0 to go back to the synchronous call, e.g. when
+# no worker is running in development.
+STRIPE_CHECKOUT_ASYNC = os.getenv('STRIPE_CHECKOUT_ASYNC', '1') != '0'
+
 api_bp = Blueprint('api', __name__)
 
+
+def _conditional_json(payload, etag):
+    """Return `payload` as JSON, or an empty 304 if the client already has `etag`."""
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(payload)
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+    return resp
+
+
+def _encoded_json(payload):
+    """Send a pre-encoded catalog.EncodedPayload, picking the variant from Accept-Encoding."""
+    encoding = request.accept_encodings.best_match(payload.encodings, default='identity')
+    etag = payload.etag_for(encoding)
+    # any variant of the current payload is the same representation for revalidation
+    if any(request.if_none_match.contains_weak(payload.etag_for(e)) for e in payload.encodings):
+        resp = Response(status=304)
+    else:
+        resp = Response(payload.body(encoding), mimetype='application/json')
+        if encoding != 'identity':
+            resp.headers['Content-Encoding'] = encoding
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+
 @api_bp.route('/menu', methods=['GET'])
+@query_budget(catalog.BUILD_QUERIES)
 def list_menu():
-    categories = Category.query.order_by(Category.position).all()
-    # fetch all active promotions (keyed by menu_item_id)
+    # served from the per-worker snapshot; rebuilt only after catalog changes
+    return _encoded_json(catalog.get_snapshot().menu_body)
+
+@api_bp.route('/menu/query', methods=['GET'])
+@query_budget(1)
+def query_menu():
+    """Filtered, keyset-paginated item listing.
+
+    Query params: category_id, available, min_price, max_price (cents),
+    on_promotion, sort (id|price|price_desc|name|newest), limit, cursor.
+    """
     try:
-        active_promos = {p.menu_item_id: p.percent for p in Promotion.query.filter_by(active=True).all()}
-    except Exception:
-        # promotions table may not exist yet
-        active_promos = {}
-    
-    result = []
-    for c in categories:
-        items = MenuItem.query.filter_by(category_id=c.id).all()
-        result.append({
-            'id': c.id,
-            'name': c.name,
-            'items': [
-                {
-                    'id': i.id,
-                    'name': i.name,
-                    'description': i.description,
-                    'price_cents': i.price_cents,
-                    'available': i.available,
-                    'image_filename': getattr(i, 'image_filename', None),
-                    'discount_percent': active_promos.get(i.id)  # None if no discount, otherwise the percent
-                }
-                for i in items
-            ]
+        params = catalog_query.parse_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _encoded_json(catalog.cached_query(params, catalog_query.run_query))
+
+
+@api_bp.route('/menu/search', methods=['GET'])
+@query_budget(catalog.BUILD_QUERIES)
+def search_menu():
+    """Typeahead search over item names/descriptions: /api/menu/search?q=sal&limit=10"""
+    q = (request.args.get('q') or '').strip()
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not q:
+        return jsonify({'items': []})
+    return jsonify({'items': search.search_items(q, max(1, min(limit, 100)))})
+
+
+@api_bp.route('/menu/changes', methods=['GET'])
+@query_budget(catalog.BUILD_QUERIES + 1)
+def menu_changes():
+    """Catalog deltas since a version: /api/menu/changes?since=<version>
+
+    Without `since` (or when the client is too far behind) the response is a
+    full snapshot with `full: true`.
+    """
+    snap = catalog.get_snapshot()
+    since = request.args.get('since')
+    if since is None or since == '':
+        return jsonify(changefeed.full_payload(snap))
+    try:
+        since = int(since)
+    except ValueError:
+        return jsonify({'error': 'since must be an integer'}), 400
+    return jsonify(changefeed.changes_since(snap, since))
+
+
+@api_bp.route('/menu/stream', methods=['GET'])
+def menu_stream():
+    """Server-Sent Events: pushes change-feed deltas as the catalog changes.
+
+    Browsers reconnect with Last-Event-ID and receive what they missed. A
+    worker already holding CATALOG_STREAM_MAX_CLIENTS streams answers 503.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    body = events.stream(last_event_id)
+    if body is None:
+        # every stream slot on this worker is taken; ask the client to come back
+        return Response(f'retry: {events.RETRY_MS}\n\n', status=503, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'Retry-After': str(events.RETRY_MS // 1000),
         })
-    return jsonify({'categories': result, 'promotions': list(active_promos.items())})
+    return Response(body, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # disable proxy buffering (nginx)
+    })
+
+
+@api_bp.route('/menu/items/<int:item_id>', methods=['GET'])
+@query_budget(catalog.BUILD_QUERIES)
+def get_menu_item(item_id):
+    """Return a single menu item (with category name and discount) from the snapshot."""
+    item = catalog.get_snapshot().items_by_id.get(item_id)
+    if not item:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(item)
+
+
+@api_bp.route('/menu/items', methods=['GET'])
+@query_budget(catalog.BUILD_QUERIES)
+def get_menu_items():
+    """Batch form of the item lookup: /api/menu/items?ids=1,2,3"""
+    raw = request.args.get('ids', '')
+    try:
+        ids = [int(x) for x in raw.split(',') if x.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+    if not ids:
+        return jsonify({'error': 'ids is required'}), 400
+    index = catalog.get_snapshot().items_by_id
+    found = [index[i] for i in ids if i in index]
+    missing = [i for i in ids if i not in index]
+    return jsonify({'items': found, 'missing': missing})
+
+
+def _price_cart(items):
+    """Price cart lines with the shared pricing engine.
+
+    Returns (quote, error): error is a message for a 400 response, or None.
+    """
+    try:
+        quote = pricing.price_cart(items)
+    except pricing.PricingError as e:
+        return None, str(e)
+    if quote.missing:
+        return None, f"Menu item {quote.missing[0]} not found"
+    if quote.unavailable:
+        return None, f"Menu item {quote.unavailable[0]} is not available"
+    return quote, None
+
+
+def _insert_order_items(order_id, quote):
+    """Insert all order lines in one executemany round trip."""
+    db.session.bulk_insert_mappings(OrderItem, [
+        {'order_id': order_id, 'menu_item_id': line['menu_item_id'], 'qty': line['qty'], 'unit_price_cents': line['unit_price_cents']}
+        for line in quote.lines
+    ])
+
+
+@api_bp.route('/cart/quote', methods=['POST'])
+@query_budget(catalog.BUILD_QUERIES)
+def cart_quote():
+    """Price a cart from in-memory catalog data; never writes.
+
+    Unknown ids are reported in `missing` and unavailable items in `unavailable`
+    (both still 200) so the cart can re-quote on every change.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        quote = pricing.price_cart(data.get('items', []))
+    except pricing.PricingError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(quote.to_dict())
+
 
 @api_bp.route('/cart/checkout', methods=['POST'])
+@idempotent
 def checkout():
     data = request.get_json() or {}
     items = data.get('items', [])
@@ -64,38 +214,28 @@ def checkout():
     if not items or not name:
         return jsonify({'error': 'Missing items or customer name'}), 400
 
-    total = 0
-    order = Order(customer_name=name, customer_email=email, customer_phone=phone, status='pending')
+    # price every line (promotions applied) before opening the write
+    quote, error = _price_cart(items)
+    if error:
+        return jsonify({'error': error}), 400
+
+    order = Order(customer_name=name, customer_email=email, customer_phone=phone, status='pending', total_cents=quote.total_cents)
     db.session.add(order)
     db.session.flush()
-
-    for it in items:
-        mi = MenuItem.query.get(it.get('menu_item_id'))
-        if not mi:
-            db.session.rollback()
-            return jsonify({'error': f"Menu item {it.get('menu_item_id')} not found"}), 400
-        qty = int(it.get('qty', 1))
-        total += mi.price_cents * qty
-        oi = OrderItem(order_id=order.id, menu_item_id=mi.id, qty=qty, unit_price_cents=mi.price_cents)
-        db.session.add(oi)
-
-    order.total_cents = total
+    _insert_order_items(order.id, quote)
     db.session.commit()
 
     return jsonify({'order_id': order.id, 'status': order.status})
 
 
 @api_bp.route('/stripe-checkout', methods=['POST'])
+@idempotent
 def stripe_checkout():
     """Create a Stripe checkout session for the cart items and create an order in database."""
-    # Ensure Stripe API key is set at runtime
-    stripe_key = os.getenv('STRIPE_SECRET_KEY')
-    
-    if stripe_key:
-        stripe.api_key = stripe_key
-    else:
+    # the key and HTTP client are configured once in create_app (stripe_client.py)
+    if not stripe.api_key:
         return jsonify({'error': 'Stripe is not configured'}), 500
-    
+
     data = request.get_json() or {}
     items = data.get('items', [])
     customer_name = data.get('customer_name')
@@ -105,83 +245,49 @@ def stripe_checkout():
     if not items or not customer_name:
         return jsonify({'error': 'Missing items or customer name'}), 400
 
-    if not stripe.api_key:
-        return jsonify({'error': 'Stripe is not configured'}), 500
+    # price every line (promotions applied) before touching the database for writes
+    quote, error = _price_cart(items)
+    if error:
+        return jsonify({'error': error}), 400
 
     try:
         # STEP 1: Create order in database BEFORE creating Stripe session
         print(f"[INFO] Creating order for customer: {customer_name}")
+        order_total_cents = quote.total_cents
         order = Order(
             customer_name=customer_name,
             customer_email=customer_email,
             customer_phone=customer_phone,
-            status='pending'
+            status='pending',
+            total_cents=order_total_cents,
         )
         db.session.add(order)
         db.session.flush()  # Get the order ID
         order_id = order.id
         print(f"[INFO] Order created with ID: {order_id}")
-        
-        # STEP 2: Prepare line items for Stripe and create OrderItems
-        line_items = []
-        order_total_cents = 0
-        
-        for it in items:
-            menu_item = MenuItem.query.get(it.get('menu_item_id'))
-            if not menu_item:
-                db.session.rollback()
-                return jsonify({'error': f"Menu item {it.get('menu_item_id')} not found"}), 400
-            
-            qty = int(it.get('qty', 1))
-            price_cents = int(menu_item.price_cents)
-            order_total_cents += price_cents * qty
-            
-            # Create OrderItem
-            order_item = OrderItem(
-                order_id=order_id,
-                menu_item_id=menu_item.id,
-                qty=qty,
-                unit_price_cents=price_cents
-            )
-            db.session.add(order_item)
-            print(f"[INFO] Added item {menu_item.name} (qty: {qty}) to order")
-            
-            # For Stripe, price is in cents
-            line_items.append({
-                'price_data': {
-                    'currency': 'usd',
-                    'product_data': {
-                        'name': menu_item.name,
-                        'description': menu_item.description,
-                    },
-                    'unit_amount': price_cents,
-                },
-                'quantity': qty,
-            })
-        
-        # Update order total
-        order.total_cents = order_total_cents
+
+        # STEP 2: Create OrderItems in bulk and prepare line items for Stripe
+        _insert_order_items(order_id, quote)
+        line_items = pricing.stripe_line_items(quote)
+
+        if STRIPE_CHECKOUT_ASYNC:
+            # STEP 3: queue the Stripe call in the same transaction as the order;
+            # the client polls statusUrl for the session URL
+            status_url = checkout_sessions.enqueue(order_id, line_items, customer_email, customer_name, customer_phone)
+            db.session.commit()
+            print(f"[INFO] Order {order_id} saved with {len(quote.lines)} items, total: {order_total_cents} cents; session queued")
+            return jsonify({
+                'orderId': order_id,
+                'status': 'pending',
+                'statusUrl': status_url,
+            }), 202
+
         db.session.commit()
-        print(f"[INFO] Order {order_id} saved with total: {order_total_cents} cents")
+        print(f"[INFO] Order {order_id} saved with {len(quote.lines)} items, total: {order_total_cents} cents")
 
         # STEP 3: Create Stripe checkout session
-        domain = os.getenv('DOMAIN', 'http://localhost:5173')
-        
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=line_items,
-            mode='payment',
-            customer_email=customer_email,
-            success_url=f"{domain}/success?session_id={{CHECKOUT_SESSION_ID}}&order_id={order_id}",
-            cancel_url=f"{domain}/cart",
-            metadata={
-                'order_id': str(order_id),
-                'customer_name': customer_name,
-                'customer_phone': customer_phone,
-            }
-        )
-        
-        print(f"[INFO] Stripe session created: {checkout_session.id}")
+        checkout_session = checkout_sessions.create_session(
+            order_id, line_items, customer_email, customer_name, customer_phone)
 
         return jsonify({
             'sessionId': checkout_session.id,
@@ -199,32 +305,28 @@ def stripe_checkout():
         return jsonify({'error': 'Failed to create checkout session'}), 500
 
 
+@api_bp.route('/orders/<int:order_id>/checkout-session', methods=['GET'])
+@query_budget(1)
+def order_checkout_session(order_id):
+    """Poll for the Stripe session of an order created by /stripe-checkout.
+
+    Needs the `token` from the statusUrl that call returned; a wrong or
+    missing token looks the same as an unknown order.
+    """
+    order = db.session.get(Order, order_id)
+    if order is None or not checkout_sessions.token_matches(order, request.args.get('token')):
+        return jsonify({'error': 'Order not found'}), 404
+    resp = jsonify(checkout_sessions.session_status(order))
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+
 @api_bp.route('/')
+@query_budget(catalog.BUILD_QUERIES)
 def index():
     """Return menu categories and items as JSON for the frontend."""
-    categories = Category.query.order_by(Category.position).all()
-    # prepare items for JSON response
-    cats = []
-    for c in categories:
-        items = MenuItem.query.filter_by(category_id=c.id).all()
-        cats.append({
-            'id': c.id,
-            'name': c.name,
-            'items': [
-                {
-                    'id': i.id,
-                    'name': i.name,
-                    'description': i.description,
-                    'price_cents': i.price_cents,
-                    'available': i.available,
-                    'image_filename': getattr(i, 'image_filename', None),
-                    'category_id': i.category_id
-                }
-                for i in items
-            ]
-        })
     # This endpoint serves the same data the frontend expects during development.
-    return jsonify(cats)
+    return _encoded_json(catalog.get_snapshot().index_body)
 
 
 # --- Admin routes (dev-only simple auth) ---------------------------------
@@ -234,13 +336,14 @@ def _is_admin(req):
 
 
 @api_bp.route('/admin/orders', methods=['GET'])
+@query_budget(2)
 def admin_list_orders():
     if not _is_admin(request):
         return jsonify({'error': 'unauthorized'}), 401
-    orders = Order.query.order_by(Order.created_at.desc()).all()
+    # order items come from a single IN query instead of one query per order
+    orders = Order.query.options(selectinload(Order.items)).order_by(Order.created_at.desc()).all()
     result = []
     for o in orders:
-        items = OrderItem.query.filter_by(order_id=o.id).all()
         result.append({
             'id': o.id,
             'customer_name': o.customer_name,
@@ -251,13 +354,21 @@ def admin_list_orders():
             'created_at': o.created_at.isoformat(),
             'items': [
                 {'menu_item_id': it.menu_item_id, 'qty': it.qty, 'unit_price_cents': it.unit_price_cents}
-                for it in items
+                for it in o.items
             ]
         })
     return jsonify(result)
 
 
+@api_bp.route('/admin/jobs/metrics', methods=['GET'])
+def admin_job_metrics():
+    if not _is_admin(request):
+        return jsonify({'error': 'unauthorized'}), 401
+    return jsonify(jobs.metrics())
+
+
 @api_bp.route('/admin/menu_items', methods=['GET'])
+@query_budget(1)
 def admin_list_menu_items():
     if not _is_admin(request):
         return jsonify({'error': 'unauthorized'}), 401
@@ -269,6 +380,7 @@ def admin_list_menu_items():
 
 
 @api_bp.route('/admin/categories', methods=['GET'])
+@query_budget(1)
 def admin_list_categories():
     if not _is_admin(request):
         return jsonify({'error': 'unauthorized'}), 401
@@ -287,7 +399,10 @@ def admin_create_category():
         return jsonify({'error': 'name is required'}), 400
     cat = Category(name=name, position=int(position))
     db.session.add(cat)
+    db.session.flush()
+    changefeed.record('category', cat.id, 'created')
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'id': cat.id, 'name': cat.name, 'position': cat.position}), 201
 
 
@@ -303,7 +418,9 @@ def admin_update_category(cat_id):
         cat.name = data['name']
     if 'position' in data:
         cat.position = int(data['position'])
+    changefeed.record('category', cat.id, 'updated')
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'ok': True})
 
 
@@ -315,7 +432,9 @@ def admin_delete_category(cat_id):
     if not cat:
         return jsonify({'error': 'not found'}), 404
     db.session.delete(cat)
+    changefeed.record('category', cat_id, 'deleted')
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'ok': True}), 200
 
 
@@ -362,7 +481,11 @@ def admin_create_menu_item():
     if image_filename:
         mi.image_filename = image_filename
     db.session.add(mi)
+    db.session.flush()
+    changefeed.record('item', mi.id, 'created')
+    stripe_sync.enqueue_sync()
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'id': mi.id, 'image_filename': getattr(mi, 'image_filename', None)}), 201
 
 
@@ -411,7 +534,10 @@ def admin_update_menu_item(item_id):
             except Exception as e:
                 db.session.rollback()
                 return jsonify({'error': 'failed to save uploaded image', 'details': str(e)}), 500
+    changefeed.record('item', mi.id, 'updated')
+    stripe_sync.enqueue_sync()
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'ok': True})
 
 
@@ -429,23 +555,40 @@ def admin_delete_menu_item(item_id):
         return jsonify({'error': 'item referenced by existing orders; cannot delete', 'order_ids': order_ids}), 400
     try:
         db.session.delete(mi)
+        changefeed.record('item', item_id, 'deleted')
+        stripe_sync.enqueue_archive(mi.stripe_product_id)
         db.session.commit()
+        catalog.invalidate()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'delete failed', 'details': str(e)}), 500
     return jsonify({'ok': True}), 200
 
 
+# (directory mtime, sorted filenames, etag) of the last gallery listing
+_gallery_cache = (None, [], None)
+
+
 @api_bp.route('/gallery', methods=['GET'])
 def gallery_list():
     """Return list of image filenames in the project Images/ folder."""
+    global _gallery_cache
     # Images folder is located at repository root: ../../Images relative to this file
     images_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'Images'))
     try:
-        files = [f for f in os.listdir(images_dir) if os.path.isfile(os.path.join(images_dir, f))]
+        mtime = os.stat(images_dir).st_mtime_ns
     except Exception:
-        files = []
-    return jsonify(sorted(files))
+        mtime = None
+    # adding or removing a file bumps the directory mtime, so only re-list then
+    if mtime is None or mtime != _gallery_cache[0]:
+        try:
+            files = sorted(f for f in os.listdir(images_dir) if os.path.isfile(os.path.join(images_dir, f)))
+        except Exception:
+            files = []
+        etag = hashlib.sha1('\n'.join(files).encode('utf-8')).hexdigest()
+        _gallery_cache = (mtime, files, etag)
+    _, files, etag = _gallery_cache
+    return _conditional_json(files, etag)
 
 
 @api_bp.route('/reservations', methods=['POST'])
@@ -514,13 +657,15 @@ def create_reservation():
 
 
 @api_bp.route('/admin/reservations', methods=['GET'])
+@query_budget(1)
 def admin_list_reservations():
     if not _is_admin(request):
         return jsonify({'error': 'unauthorized'}), 401
-    resv = Reservation.query.order_by(Reservation.time_slot.desc()).all()
+    # customers are joined into the same query
+    resv = Reservation.query.options(joinedload(Reservation.customer)).order_by(Reservation.time_slot.desc()).all()
     out = []
     for r in resv:
-        cust = Customer.query.get(r.customer_id)
+        cust = r.customer
         out.append({
             'id': r.id,
             'customer': {'id': cust.id, 'name': cust.name, 'email': cust.email, 'phone': cust.phone},
@@ -549,6 +694,7 @@ def admin_delete_reservation(res_id):
 
 
 @api_bp.route('/admin/promotions', methods=['GET'])
+@query_budget(1)
 def admin_list_promotions():
     if not _is_admin(request):
         return jsonify({'error': 'unauthorized'}), 401
@@ -586,7 +732,11 @@ def admin_create_promotion():
         return jsonify({'error': 'percent must be an integer 0-100'}), 400
     promo = Promotion(menu_item_id=menu_item_id, percent=percent, active=active)
     db.session.add(promo)
+    db.session.flush()
+    changefeed.record('promotion', promo.id, 'created', menu_item_id=promo.menu_item_id)
+    stripe_sync.enqueue_sync()
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'id': promo.id, 'menu_item_id': promo.menu_item_id, 'percent': promo.percent, 'active': promo.active}), 201
 
 
@@ -608,7 +758,10 @@ def admin_update_promotion(pid):
             return jsonify({'error': 'percent must be an integer 0-100'}), 400
     if 'active' in data:
         promo.active = bool(data['active'])
+    changefeed.record('promotion', promo.id, 'updated', menu_item_id=promo.menu_item_id)
+    stripe_sync.enqueue_sync()
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'ok': True})
 
 
@@ -620,7 +773,10 @@ def admin_delete_promotion(pid):
     if not promo:
         return jsonify({'error': 'not found'}), 404
     db.session.delete(promo)
+    changefeed.record('promotion', pid, 'deleted', menu_item_id=promo.menu_item_id)
+    stripe_sync.enqueue_sync()
     db.session.commit()
+    catalog.invalidate()
     return jsonify({'ok': True}), 200
 
 
@@ -655,10 +811,32 @@ def newsletter_signup():
 
 
 # --- Airtel Money integration ------------------------------------------------
-from .airtel_client import AirtelClient
-import json
+from .airtel_client import AirtelClient, AirtelUnavailable, AsyncAirtelClient
+from . import airtel_batch, airtel_notifications
+from .airtel_auth import TokenError
+import requests
 
+# one pooled client (and circuit breaker) shared by all request threads
 airtel_client = AirtelClient()
+# batches get their own connection pool but trip the same breaker
+airtel_async = AsyncAirtelClient(airtel_client, concurrency=airtel_batch.BATCH_CONCURRENCY)
+
+
+def _airtel_proxy(call, *args):
+    """Run an Airtel call and relay its status and body."""
+    try:
+        resp = call(*args)
+    except AirtelUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except (requests.exceptions.RequestException, TokenError) as e:
+        return jsonify({'error': str(e)}), 502
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    try:
+        body = resp.json()
+    except Exception:
+        body = {'raw': resp.text}
+    return jsonify({'status_code': resp.status_code, 'response': body}), resp.status_code
 
 
 @api_bp.route('/airtel/merchants', methods=['POST'])
@@ -670,15 +848,7 @@ def airtel_register_merchants():
     merchants = data.get('merchants')
     if not merchants:
         return jsonify({'error': 'merchants list required'}), 400
-    try:
-        resp = airtel_client.register_merchants(merchants)
-        try:
-            body = resp.json()
-        except Exception:
-            body = {'raw': resp.text}
-        return jsonify({'status_code': resp.status_code, 'response': body}), resp.status_code
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _airtel_proxy(airtel_client.register_merchants, merchants)
 
 
 @api_bp.route('/airtel/merchants', methods=['GET'])
@@ -686,15 +856,7 @@ def airtel_fetch_merchants():
     """Fetch registered merchants from Airtel."""
     if not _is_admin(request):
         return jsonify({'error': 'unauthorized'}), 401
-    try:
-        resp = airtel_client.fetch_merchants()
-        try:
-            body = resp.json()
-        except Exception:
-            body = {'raw': resp.text}
-        return jsonify({'status_code': resp.status_code, 'response': body}), resp.status_code
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _airtel_proxy(airtel_client.fetch_merchants)
 
 
 @api_bp.route('/airtel/payments', methods=['POST'])
@@ -705,15 +867,7 @@ def airtel_create_payment():
     payload = request.get_json() or {}
     if not payload:
         return jsonify({'error': 'json payload required'}), 400
-    try:
-        resp = airtel_client.create_payment(payload)
-        try:
-            body = resp.json()
-        except Exception:
-            body = {'raw': resp.text}
-        return jsonify({'status_code': resp.status_code, 'response': body}), resp.status_code
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _airtel_proxy(airtel_client.create_payment, payload)
 
 
 @api_bp.route('/airtel/payments/refund', methods=['POST'])
@@ -724,22 +878,55 @@ def airtel_refund_payment():
     payload = request.get_json() or {}
     if not payload:
         return jsonify({'error': 'json payload required'}), 400
+    return _airtel_proxy(airtel_client.refund_payment, payload)
+
+
+@api_bp.route('/airtel/batch', methods=['POST'])
+def airtel_batch_operation():
+    """Run many payments or refunds concurrently; returns a result per item.
+
+    Body: {"operation": "payment" | "refund", "items": [payload, ...] or
+    [{"partner": code, "payload": {...}}, ...], "concurrency": n (optional)}.
+    """
+    if not _is_admin(request):
+        return jsonify({'error': 'unauthorized'}), 401
+    data = request.get_json(silent=True) or {}
+    operation = data.get('operation')
+    if operation not in airtel_batch.OPERATIONS:
+        return jsonify({'error': f"operation must be one of {sorted(airtel_batch.OPERATIONS)}"}), 400
     try:
-        resp = airtel_client.refund_payment(payload)
-        try:
-            body = resp.json()
-        except Exception:
-            body = {'raw': resp.text}
-        return jsonify({'status_code': resp.status_code, 'response': body}), resp.status_code
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        items = airtel_batch.parse_items(data.get('items'))
+        concurrency = int(data.get('concurrency') or airtel_batch.BATCH_CONCURRENCY)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    concurrency = max(1, min(concurrency, airtel_batch.BATCH_CONCURRENCY))
+    return jsonify(airtel_batch.batch(airtel_async, operation, items, concurrency=concurrency))
 
 
 @api_bp.route('/airtel/notify/<partnerCode>', methods=['POST'])
 def airtel_notify(partnerCode):
-    """Receive notifications from Airtel. This is a simple receiver that logs payload."""
+    """Receive a payment notification from Airtel.
+
+    The callback is buffered and written in batches (airtel_notifications.py),
+    so acknowledging it costs no database round trip. Only callbacks signed
+    by a configured partner change the order; see airtel_notifications.verify().
+    """
     data = request.get_json(silent=True) or {}
-    # For now: persist nothing, but log to stdout and return success
-    print(f"[AIRTEL NOTIFY] partner={partnerCode} payload=", json.dumps(data))
+    outcome = airtel_notifications.receive(partnerCode, data, request.get_data(as_text=True),
+                                           request.headers.get('X-Callback-Signature'))
+    if outcome == 'forbidden':
+        return jsonify({'st': False, 'msg': 'unknown partner'}), 403
+    if outcome == 'invalid':
+        return jsonify({'st': False, 'msg': 'transaction.id is required'}), 400
+    if outcome == 'full':
+        # database backed up; Airtel redelivers later
+        return jsonify({'st': False, 'msg': 'TRY_LATER'}), 503
     return jsonify({'st': True, 'msg': 'SUCCESS'}), 200
 
+
+@api_bp.route('/admin/airtel/notifications/stats', methods=['GET'])
+def airtel_notification_stats():
+    if not _is_admin(request):
+        return jsonify({'error': 'unauthorized'}), 401
+    return jsonify(airtel_notifications.stats())
+
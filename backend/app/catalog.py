@@ -0,0 +1,214 @@
+"""In-process snapshot of the public catalog (categories, items, promotions).
+
+The snapshot is built once per catalog version and kept in memory by each
+worker. Admin routes that mutate Category, MenuItem or Promotion call
+`invalidate()` after committing; that publishes a new version on the catalog
+bus (see catalog_bus.py) and every worker rebuilds on its next read.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import selectinload
+
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip/identity
+    brotli = None
+
+from . import catalog_bus, changefeed, pricing
+from .models import Category, Promotion
+
+
+class MenuSnapshot:
+    """Immutable view of the catalog at a given version."""
+
+    def __init__(self, version, categories, promotions, change_bounds=(0, 0), stripe_prices=None):
+        self.version = version
+        # change-log position this snapshot is at least as new as (see changefeed.py)
+        self.oldest_change, self.change_version = change_bounds
+        # payload for GET /api/menu
+        self.menu = {'categories': categories, 'promotions': promotions}
+        # payload for the legacy GET /api/ index (no discount, with category_id)
+        self.index = [
+            {
+                'id': c['id'],
+                'name': c['name'],
+                'items': [
+                    {k: v for k, v in i.items() if k != 'discount_percent'}
+                    for i in c['items']
+                ],
+            }
+            for c in categories
+        ]
+        # id -> item (with category name) for the per-item endpoints
+        self.items_by_id = {
+            i['id']: dict(i, category_name=c['name'])
+            for c in categories
+            for i in c['items']
+        }
+        # id -> effective price (promotion applied) used by every pricing path
+        self.prices = pricing.build_price_table(self.items_by_id)
+        # id -> (Stripe price id, its unit_amount) for items mirrored by stripe_sync.py
+        self.stripe_prices = stripe_prices or {}
+        # ready-to-send bodies, encoded once per version
+        self.menu_body = EncodedPayload(self.menu)
+        self.index_body = EncodedPayload(self.index)
+
+
+class EncodedPayload:
+    """JSON body serialized once, with compressed variants produced on first use.
+
+    The ETag is content-based so every worker hands out the same tag for the
+    same catalog; compressed variants get a suffixed tag since their bytes differ.
+    """
+
+    def __init__(self, payload):
+        self.identity = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.identity).hexdigest()
+        self._variants = {'identity': self.identity}
+        self._lock = threading.Lock()
+
+    @property
+    def encodings(self):
+        """Content codings this payload can be served in, in server preference order."""
+        return ['br', 'gzip', 'identity'] if brotli is not None else ['gzip', 'identity']
+
+    def etag_for(self, encoding):
+        return self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+
+    def body(self, encoding):
+        body = self._variants.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._variants.get(encoding)
+                if body is None:
+                    body = _compress(self.identity, encoding)
+                    self._variants[encoding] = body
+        return body
+
+
+def _compress(data, encoding):
+    if encoding == 'gzip':
+        # mtime=0 keeps the output (and thus the ETag) identical across workers
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    raise ValueError(f'unsupported encoding {encoding}')
+
+
+# bounded LRU of encoded query results, keyed by (catalog version, params)
+QUERY_CACHE_SIZE = 256
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+# queries issued by a snapshot rebuild; budget for endpoints served from it
+BUILD_QUERIES = 4
+
+_build_lock = threading.Lock()
+_bus = catalog_bus.LocalBackend()
+_snapshot = None
+
+
+def init_app(app, db):
+    """Attach the cross-worker version bus configured for `app`."""
+    global _bus, _snapshot
+    _snapshot = None
+    _query_cache.clear()
+    with app.app_context():
+        _bus = catalog_bus.create_backend(app, db.engine)
+
+
+def invalidate():
+    """Mark the catalog changed in every worker. Call after committing a catalog change."""
+    global _snapshot
+    try:
+        return _bus.publish()
+    except Exception as e:
+        # the change is committed; at least make this worker rebuild
+        print(f"[WARNING] failed to publish catalog change: {e}")
+        _snapshot = None
+        _query_cache.clear()
+
+
+def current_version():
+    """Return the newest catalog version this worker knows about."""
+    return _bus.latest()
+
+
+def get_snapshot():
+    """Return the current snapshot, rebuilding it if the catalog changed."""
+    global _snapshot
+    snap = _snapshot
+    if snap is not None and snap.version >= _bus.latest():
+        return snap
+    with _build_lock:
+        # another thread may have rebuilt it while we waited for the lock;
+        # capture the version before querying so a concurrent change is not lost
+        version = _bus.latest()
+        if _snapshot is None or _snapshot.version < version:
+            _snapshot = _build(version)
+        return _snapshot
+
+
+def cached_query(params, build):
+    """Return an EncodedPayload for `params`, calling `build(params)` on a miss.
+
+    Entries are keyed by the catalog version, so a catalog change makes every
+    cached result unreachable; stale entries age out of the LRU.
+    """
+    key = (_bus.latest(), params)
+    with _query_cache_lock:
+        payload = _query_cache.get(key)
+        if payload is not None:
+            _query_cache.move_to_end(key)
+            return payload
+    payload = EncodedPayload(build(params))
+    with _query_cache_lock:
+        _query_cache[key] = payload
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return payload
+
+
+def _build(version):
+    # constant number of queries regardless of catalog size:
+    # change-log bounds, categories, their items (one IN query), active promotions.
+    # Read the log position first so the data below is at least that new.
+    change_bounds = changefeed.log_bounds()
+    categories = Category.query.options(selectinload(Category.items)).order_by(Category.position).all()
+    # fetch all active promotions (keyed by menu_item_id)
+    try:
+        active_promos = {p.menu_item_id: p.percent for p in Promotion.query.filter_by(active=True).all()}
+    except Exception:
+        # promotions table may not exist yet
+        active_promos = {}
+
+    result = []
+    for c in categories:
+        result.append({
+            'id': c.id,
+            'name': c.name,
+            'items': [
+                {
+                    'id': i.id,
+                    'name': i.name,
+                    'description': i.description,
+                    'price_cents': i.price_cents,
+                    'available': i.available,
+                    'image_filename': getattr(i, 'image_filename', None),
+                    'category_id': i.category_id,
+                    'discount_percent': active_promos.get(i.id)  # None if no discount, otherwise the percent
+                }
+                for i in c.items
+            ]
+        })
+    stripe_prices = {
+        i.id: (i.stripe_price_id, i.stripe_price_cents)
+        for c in categories
+        for i in c.items
+        if i.stripe_price_id
+    }
+    return MenuSnapshot(version, result, list(active_promos.items()), change_bounds, stripe_prices)
@@ -0,0 +1,200 @@
+"""Cross-worker catalog version bus.
+
+Every worker keeps its own catalog snapshot (see catalog.py). When one worker
+commits an admin change it publishes "catalog changed, version N"; the other
+workers only record the new version and rebuild lazily on their next read,
+so a change never triggers a burst of simultaneous rebuilds.
+
+Backends:
+  local     in-process counter (single worker, tests)
+  file      version counter in a shared file; single host, any database
+  postgres  sequence + LISTEN/NOTIFY; works across hosts
+
+Pick one with CATALOG_BUS (default: postgres for PostgreSQL URLs, file otherwise).
+"""
+import hashlib
+import os
+import select
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked writes
+    fcntl = None
+
+
+class LocalBackend:
+    name = 'local'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def publish(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def latest(self):
+        return self._version
+
+
+class FileBackend:
+    """Version counter stored in a file shared by all workers on the host."""
+
+    name = 'file'
+    # re-read the file at least this often even if its stat looks unchanged
+    # (guards against coarse filesystem timestamps)
+    MAX_STAT_AGE = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stat = None
+        self._checked_at = 0.0
+        self._version = 0
+
+    def _read(self, f):
+        f.seek(0)
+        raw = f.read().strip()
+        return int(raw) if raw else 0
+
+    def publish(self):
+        with self._lock, open(self.path, 'a+') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                version = self._read(f) + 1
+                f.seek(0)
+                f.truncate()
+                f.write(str(version))
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            self._version = max(self._version, version)
+            return version
+
+    def latest(self):
+        now = time.monotonic()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return self._version
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if key != self._stat or now - self._checked_at > self.MAX_STAT_AGE:
+            try:
+                with open(self.path) as f:
+                    self._version = max(self._version, self._read(f))
+            except (OSError, ValueError):
+                return self._version
+            self._stat = key
+            self._checked_at = now
+        return self._version
+
+
+class PostgresBackend:
+    """Global version from a sequence, broadcast with NOTIFY.
+
+    Each worker runs one listener thread (started lazily, so it survives
+    gunicorn's pre-fork) that records the highest version it has seen. After a
+    reconnect it re-reads the sequence so notifications missed while
+    disconnected are not lost.
+
+    Nothing connects at construction: the sequence is created by a migration,
+    a database that is down at startup is retried by the listener, and a
+    pre-forking parent holds no connection its workers would inherit.
+    """
+
+    name = 'postgres'
+    SEQUENCE = 'catalog_version_seq'
+    CHANNEL = 'catalog_changed'
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._version = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def publish(self):
+        with self.engine.begin() as conn:
+            version = conn.exec_driver_sql(f"SELECT nextval('{self.SEQUENCE}')").scalar()
+            conn.exec_driver_sql(f"SELECT pg_notify('{self.CHANNEL}', %s)", (str(version),))
+        self._seen(version)
+        return version
+
+    def latest(self):
+        if self._pid != os.getpid():
+            self._start_listener()
+        return self._version
+
+    def _seen(self, version):
+        with self._lock:
+            if version > self._version:
+                self._version = version
+
+    def _current(self, conn):
+        cur = conn.cursor()
+        cur.execute(f'SELECT last_value, is_called FROM {self.SEQUENCE}')
+        last_value, is_called = cur.fetchone()
+        return last_value if is_called else 0
+
+    def _start_listener(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        t = threading.Thread(target=self._listen, name='catalog-bus', daemon=True)
+        t.start()
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        dsn = self.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f'LISTEN {self.CHANNEL}')
+                self._seen(self._current(conn))
+                backoff = 1
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        note = conn.notifies.pop(0)
+                        try:
+                            self._seen(int(note.payload))
+                        except ValueError:
+                            pass
+            except Exception as e:
+                print(f"[WARNING] catalog bus listener disconnected: {e}")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+def create_backend(app, engine):
+    kind = app.config.get('CATALOG_BUS')
+    if not kind:
+        kind = 'postgres' if engine.dialect.name == 'postgresql' else 'file'
+    if kind == 'postgres':
+        return PostgresBackend(engine)
+    if kind == 'file':
+        path = app.config.get('CATALOG_BUS_FILE')
+        if not path:
+            # one counter per database so unrelated apps on the host don't collide
+            tag = hashlib.sha1(str(engine.url).encode('utf-8')).hexdigest()[:12]
+            path = os.path.join(tempfile.gettempdir(), f'catalog-version-{tag}')
+        return FileBackend(path)
+    return LocalBackend()
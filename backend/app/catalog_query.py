@@ -0,0 +1,147 @@
+"""Filtered, keyset-paginated catalog queries for GET /api/menu/query.
+
+Filters map onto the (category_id, available, price_cents) index on menu_items
+and the (menu_item_id, active) index on promotions. Pages are addressed by an
+opaque cursor holding the last row's sort key and id, so deep pages cost the
+same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from .models import MenuItem, Promotion
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# sort name -> (column, descending)
+SORTS = {
+    'id': (MenuItem.id, False),
+    'price': (MenuItem.price_cents, False),
+    'price_desc': (MenuItem.price_cents, True),
+    'name': (MenuItem.name, False),
+    'newest': (MenuItem.created_at, True),
+}
+
+
+def _parse_bool(value, name):
+    v = value.strip().lower()
+    if v in ('1', 'true', 'yes'):
+        return True
+    if v in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+
+
+def parse_params(args):
+    """Validate query-string arguments into a normalized, hashable tuple.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    category_id = _parse_int(args['category_id'], 'category_id') if args.get('category_id') else None
+    available = _parse_bool(args['available'], 'available') if args.get('available') else None
+    min_price = _parse_int(args['min_price'], 'min_price') if args.get('min_price') else None
+    max_price = _parse_int(args['max_price'], 'max_price') if args.get('max_price') else None
+    on_promotion = _parse_bool(args['on_promotion'], 'on_promotion') if args.get('on_promotion') else None
+    sort = args.get('sort', 'id')
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    limit = _parse_int(args.get('limit', DEFAULT_LIMIT), 'limit')
+    if limit < 1 or limit > MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+    cursor = args.get('cursor') or None
+    if cursor:
+        _decode_cursor(cursor)  # validate early
+    return (category_id, available, min_price, max_price, on_promotion, sort, limit, cursor)
+
+
+def _encode_cursor(key, item_id):
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat()
+    raw = json.dumps([key, item_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return key, int(item_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def run_query(params):
+    """Execute a query for params returned by `parse_params` and return the page payload."""
+    category_id, available, min_price, max_price, on_promotion, sort, limit, cursor = params
+    column, descending = SORTS[sort]
+
+    # one query: items plus their active promotion percent (if any)
+    q = MenuItem.query.with_entities(MenuItem, Promotion.percent).outerjoin(
+        Promotion, and_(Promotion.menu_item_id == MenuItem.id, Promotion.active.is_(True))
+    )
+    if category_id is not None:
+        q = q.filter(MenuItem.category_id == category_id)
+    if available is not None:
+        q = q.filter(MenuItem.available.is_(available))
+    if min_price is not None:
+        q = q.filter(MenuItem.price_cents >= min_price)
+    if max_price is not None:
+        q = q.filter(MenuItem.price_cents <= max_price)
+    if on_promotion is True:
+        q = q.filter(Promotion.id.isnot(None))
+    elif on_promotion is False:
+        q = q.filter(Promotion.id.is_(None))
+
+    # a nullable sort column (created_at) puts its NULL rows last in either
+    # direction, so the cursor can say "past every non-NULL key"
+    nullable = column.nullable
+    if cursor:
+        key, last_id = _decode_cursor(cursor)
+        after_id = MenuItem.id < last_id if descending else MenuItem.id > last_id
+        if key is None:
+            # the previous page ended inside the NULL tail
+            q = q.filter(column.is_(None), after_id)
+        else:
+            if column is MenuItem.created_at:
+                key = datetime.fromisoformat(key)
+            after_key = or_(column < key if descending else column > key, and_(column == key, after_id))
+            q = q.filter(or_(after_key, column.is_(None)) if nullable else after_key)
+
+    order = column.desc() if descending else column.asc()
+    if nullable:
+        order = order.nulls_last()
+    q = q.order_by(order, MenuItem.id.desc() if descending else MenuItem.id.asc())
+
+    # fetch one extra row to know whether there is a next page
+    rows = q.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        {
+            'id': i.id,
+            'name': i.name,
+            'description': i.description,
+            'price_cents': i.price_cents,
+            'available': i.available,
+            'image_filename': getattr(i, 'image_filename', None),
+            'category_id': i.category_id,
+            'discount_percent': percent,
+        }
+        for i, percent in rows
+    ]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1][0]
+        next_cursor = _encode_cursor(getattr(last, column.key), last.id)
+    return {'items': items, 'next_cursor': next_cursor}
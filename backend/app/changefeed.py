@@ -0,0 +1,116 @@
+"""Catalog change log and the delta feed behind GET /api/menu/changes.
+
+Admin routes call `record()` inside the same transaction as the mutation, so
+the log never disagrees with the catalog. A client passes the last version it
+saw and receives only the entities that changed since, with their current
+state taken from the catalog snapshot. Clients that are too far behind (or
+older than the retained log) get a full snapshot instead.
+
+Change ids are the versions, so they must become visible in id order: a
+change committed with a lower id after a client has seen a higher one would
+never be sent to it. SQLite serialises writers anyway; on PostgreSQL
+record() takes a transaction-scoped advisory lock, so change-recording
+transactions allocate ids and commit one at a time.
+
+Rows older than RETENTION are purged by the job worker (the newest row is
+always kept so the head version never goes backwards).
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from . import db, dbtasks, jobs
+from .models import CatalogChange
+
+# beyond this many log rows a full snapshot is cheaper than replaying deltas
+MAX_CHANGES = 500
+RETENTION = timedelta(days=int(os.getenv('CATALOG_CHANGES_RETENTION_DAYS', '30')))
+PURGE_INTERVAL = 3600
+# pg_advisory_xact_lock key serialising catalog change transactions
+LOCK_KEY = 0x63617463
+
+
+def record(entity, entity_id, op, menu_item_id=None):
+    """Add a change row to the current session; committed with the mutation."""
+    if db.engine.dialect.name == 'postgresql':
+        # held until commit/rollback; re-taking it in the same transaction is free
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': LOCK_KEY})
+    db.session.add(CatalogChange(entity=entity, entity_id=entity_id, op=op, menu_item_id=menu_item_id))
+
+
+def log_bounds():
+    """Return (oldest, newest) change ids, or (0, 0) when the log is empty."""
+    oldest, newest = db.session.query(db.func.min(CatalogChange.id), db.func.max(CatalogChange.id)).one()
+    return oldest or 0, newest or 0
+
+
+def full_payload(snap):
+    return {'version': snap.change_version, 'full': True, 'menu': snap.menu}
+
+
+def changes_since(snap, since):
+    """Build the response for a client at version `since`, against snapshot `snap`."""
+    head = snap.change_version
+    if since >= head:
+        # the common poll: nothing changed, no database access
+        return {'version': head, 'full': False, 'changes': []}
+    if since < snap.oldest_change - 1:
+        return full_payload(snap)
+
+    rows = (CatalogChange.query
+            .filter(CatalogChange.id > since, CatalogChange.id <= head)
+            .order_by(CatalogChange.id)
+            .limit(MAX_CHANGES + 1)
+            .all())
+    if len(rows) > MAX_CHANGES:
+        return full_payload(snap)
+
+    # collapse to the latest operation per entity, keeping first-seen order
+    latest = {}
+    for r in rows:
+        latest.pop((r.entity, r.entity_id), None)
+        latest[(r.entity, r.entity_id)] = r
+        if r.entity == 'promotion' and r.menu_item_id is not None:
+            # a promotion change is an update of the item's discount
+            latest.pop(('item', r.menu_item_id), None)
+            latest[('item', r.menu_item_id)] = CatalogChange(entity='item', entity_id=r.menu_item_id, op='updated')
+
+    categories = {c['id']: c for c in snap.menu['categories']}
+    changes = []
+    for (entity, entity_id), r in latest.items():
+        data = None
+        if entity == 'item':
+            data = snap.items_by_id.get(entity_id)
+        elif entity == 'category':
+            c = categories.get(entity_id)
+            data = {'id': c['id'], 'name': c['name']} if c else None
+        elif entity == 'promotion':
+            data = {'menu_item_id': r.menu_item_id}
+        op = r.op
+        # created/updated but gone from the snapshot (e.g. its category was deleted)
+        if data is None and op != 'deleted' and entity != 'promotion':
+            op = 'deleted'
+        changes.append({'entity': entity, 'id': entity_id, 'op': op, 'data': data if op != 'deleted' else None})
+    return {'version': head, 'full': False, 'changes': changes}
+
+
+def purge():
+    """Delete log rows past the retention window; returns rows removed."""
+    from . import catalog
+
+    newest = db.session.query(db.func.max(CatalogChange.id)).scalar()
+    if newest is None:
+        return 0
+    cutoff = datetime.utcnow() - RETENTION
+    n = (CatalogChange.query.filter(CatalogChange.created_at < cutoff, CatalogChange.id < newest)
+         .delete(synchronize_session=False))
+    db.session.commit()
+    if n:
+        # snapshots carry the oldest retained id; rebuild them so clients
+        # behind it get a full snapshot instead of a partial delta
+        catalog.invalidate()
+    return n
+
+
+jobs.poller(dbtasks.throttled(PURGE_INTERVAL, 'catalog_changes purge')(purge))
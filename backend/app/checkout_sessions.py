@@ -0,0 +1,103 @@
+"""Stripe Checkout session creation, run by the job queue.
+
+/api/stripe-checkout commits the order together with a
+`stripe.create_checkout_session` job and returns immediately; a worker creates
+the session and stores its id and URL on the order, which the client polls
+through /api/orders/<id>/checkout-session.
+
+Order ids are sequential, so the polling URL carries a random per-order
+token (status_url()); without it the route would hand out any customer's
+payment link.
+"""
+import hmac
+import os
+import secrets
+
+import stripe
+
+from . import db, jobs
+from .models import Order
+
+JOB_KIND = 'stripe.create_checkout_session'
+
+
+def create_session(order_id, line_items, customer_email=None, customer_name=None, customer_phone=None):
+    """Create the Checkout session for an order and record it on the order."""
+    domain = os.getenv('DOMAIN', 'http://localhost:5173')
+    checkout_session = stripe.checkout.Session.create(
+        payment_method_types=['card'],
+        line_items=line_items,
+        mode='payment',
+        customer_email=customer_email,
+        success_url=f"{domain}/success?session_id={{CHECKOUT_SESSION_ID}}&order_id={order_id}",
+        cancel_url=f"{domain}/cart",
+        metadata={
+            'order_id': str(order_id),
+            'customer_name': customer_name,
+            'customer_phone': customer_phone,
+        },
+        # retries of the same job must not open a second session
+        idempotency_key=f'order-{order_id}-checkout-session',
+    )
+    Order.query.filter_by(id=order_id).update(
+        {'stripe_session_id': checkout_session.id, 'stripe_session_url': checkout_session.url},
+        synchronize_session=False)
+    db.session.commit()
+    print(f"[INFO] Stripe session created for order {order_id}: {checkout_session.id}")
+    return checkout_session
+
+
+def _mark_failed(payload, error):
+    Order.query.filter_by(id=payload['order_id'], status='pending').update(
+        {'status': 'failed'}, synchronize_session=False)
+    db.session.commit()
+    print(f"[ERROR] Giving up on Stripe session for order {payload['order_id']}: {error}")
+
+
+@jobs.handler(JOB_KIND, on_failure=_mark_failed)
+def _create_session_job(payload):
+    try:
+        create_session(**payload)
+    except (stripe.error.InvalidRequestError, stripe.error.AuthenticationError,
+            stripe.error.PermissionError) as e:
+        # the request itself is wrong; retrying sends the same thing again
+        raise jobs.PermanentError(str(e))
+
+
+def enqueue(order_id, line_items, customer_email=None, customer_name=None, customer_phone=None):
+    """Queue session creation in the caller's transaction; returns the polling URL."""
+    token = secrets.token_urlsafe(24)
+    Order.query.filter_by(id=order_id).update({'checkout_token': token}, synchronize_session=False)
+    jobs.enqueue(JOB_KIND, {
+        'order_id': order_id,
+        'line_items': line_items,
+        'customer_email': customer_email,
+        'customer_name': customer_name,
+        'customer_phone': customer_phone,
+    })
+    return status_url(order_id, token)
+
+
+def status_url(order_id, token):
+    return f'/api/orders/{order_id}/checkout-session?token={token}'
+
+
+def token_matches(order, token):
+    """True if `token` is the polling token issued for `order`."""
+    return bool(order.checkout_token and token) and hmac.compare_digest(order.checkout_token, token)
+
+
+def session_status(order):
+    """Polling payload for an order's checkout session."""
+    if order.stripe_session_url:
+        state = 'ready'
+    elif order.status == 'failed':
+        state = 'failed'
+    else:
+        state = 'pending'
+    return {
+        'orderId': order.id,
+        'status': state,
+        'sessionId': order.stripe_session_id,
+        'url': order.stripe_session_url,
+    }
@@ -0,0 +1,63 @@
+"""Helpers shared by the tables used as work queues and expiring caches.
+
+claim() is the concurrent-safe claim behind the job queue (jobs.py) and the
+Stripe webhook inbox (webhooks.py); throttled() rate-limits the periodic
+purges of jobs, webhook events and idempotency keys.
+"""
+import threading
+import time
+from functools import wraps
+
+from . import db
+
+
+def claim(model, ready, order_by, limit, values):
+    """Claim up to `limit` rows matching `ready`; returns their ids.
+
+    Rows need `id`, `status` and `attempts` columns. Each candidate is taken
+    with a conditional UPDATE on its current (status, attempts), setting
+    `values(row_attempts)`; `attempts` doubles as a fencing token, so of two
+    workers racing for a row only one wins, and a worker whose claim timed
+    out can no longer finish it once someone else has re-claimed it. On
+    PostgreSQL the candidates are also selected FOR UPDATE SKIP LOCKED so
+    workers don't even contend.
+    """
+    q = db.session.query(model.id, model.status, model.attempts).filter(ready).order_by(order_by).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        q = q.with_for_update(skip_locked=True)
+    claimed = []
+    for row_id, status, attempts in q.all():
+        taken = (model.query
+                 .filter(model.id == row_id, model.status == status, model.attempts == attempts)
+                 .update(values(attempts), synchronize_session=False))
+        if taken:
+            claimed.append(row_id)
+    db.session.commit()
+    return claimed
+
+
+def throttled(interval, label):
+    """Decorator: run `fn()` at most once per `interval` seconds per worker.
+
+    Skipped calls return 0; a failure is rolled back and logged, never raised,
+    so callers can invoke it opportunistically from hot paths.
+    """
+    def wrap(fn):
+        lock = threading.Lock()
+        last = [0.0]
+
+        @wraps(fn)
+        def maybe():
+            now = time.monotonic()
+            with lock:
+                if now - last[0] < interval:
+                    return 0
+                last[0] = now
+            try:
+                return fn()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[WARNING] {label} failed: {e}")
+                return 0
+        return maybe
+    return wrap
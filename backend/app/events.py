@@ -0,0 +1,165 @@
+"""Server-Sent Events stream of catalog changes (GET /api/menu/stream).
+
+One broadcaster thread per worker watches the catalog version (an in-memory
+read for the postgres/local bus, a stat for the file bus), turns each change
+into a delta with changefeed.changes_since() and fans it out to every
+connected client. Connections never touch the database themselves.
+
+Each client has a bounded queue; a client that falls that far behind is
+disconnected and reconnects with Last-Event-ID, catching up from the change
+feed instead of holding server memory.
+
+Every open stream holds a request thread for as long as it stays connected,
+so serve the app with a threaded or async worker (gunicorn -k gthread
+--threads N, or -k gevent) and keep CATALOG_STREAM_MAX_CLIENTS below the
+threads per worker. Past that cap a worker answers 503 with a retry hint
+instead of taking the threads its other requests need.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from werkzeug.wsgi import ClosingIterator
+
+from . import catalog, changefeed
+
+# how often the broadcaster checks the catalog version
+POLL_INTERVAL = float(os.getenv('CATALOG_STREAM_POLL_INTERVAL', '1.0'))
+# idle connections get a comment line this often so proxies keep them open
+HEARTBEAT_INTERVAL = float(os.getenv('CATALOG_STREAM_HEARTBEAT', '15'))
+# events buffered per client before it is dropped as a slow consumer
+CLIENT_BUFFER = int(os.getenv('CATALOG_STREAM_BUFFER', '32'))
+# open streams per worker; leave threads for ordinary requests
+MAX_CLIENTS = int(os.getenv('CATALOG_STREAM_MAX_CLIENTS', '16'))
+# milliseconds browsers wait before reconnecting
+RETRY_MS = 3000
+
+_DROPPED = object()
+
+
+def format_event(payload, event='catalog'):
+    data = json.dumps(payload, separators=(',', ':'))
+    return f"id: {payload['version']}\nevent: {event}\ndata: {data}\n\n"
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=CLIENT_BUFFER)
+
+
+class Broadcaster:
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._pid = None
+        self._version = None      # catalog bus version last seen
+        self._change_version = None  # change-feed version last broadcast
+
+    def subscribe(self):
+        """Register a client; returns None if MAX_CLIENTS are already connected."""
+        sub = Subscriber()
+        with self._lock:
+            if len(self._subscribers) >= MAX_CLIENTS:
+                return None
+            self._subscribers.add(sub)
+            # start lazily in the serving process (after any pre-fork)
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='catalog-stream', daemon=True).start()
+        return sub
+
+    def seed(self, snap):
+        """Start broadcasting from `snap` if nothing has been broadcast yet."""
+        with self._lock:
+            if self._change_version is None:
+                self._version = snap.version
+                self._change_version = snap.change_version
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, message):
+        with self._lock:
+            subs = list(self._subscribers)
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                # slow consumer: drop it rather than buffer without bound
+                self.unsubscribe(sub)
+                try:
+                    sub.queue.get_nowait()
+                    sub.queue.put_nowait(_DROPPED)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _run(self):
+        while True:
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"[WARNING] catalog stream broadcaster error: {e}")
+            time.sleep(POLL_INTERVAL)
+
+    def _tick(self):
+        version = catalog.current_version()
+        if version == self._version:
+            return
+        with self.app.app_context():
+            snap = catalog.get_snapshot()
+            if self._change_version is None:
+                # no client seeded a starting point yet
+                payload = None
+            else:
+                payload = changefeed.changes_since(snap, self._change_version)
+        self._version = snap.version
+        if payload is not None and (payload['full'] or payload['changes']):
+            self.publish(format_event(payload))
+        self._change_version = snap.change_version
+
+
+_broadcaster = None
+
+
+def init_app(app):
+    global _broadcaster
+    _broadcaster = Broadcaster(app)
+
+
+def stream(last_event_id=None):
+    """Return an iterable of SSE lines for one client, or None if the worker is full.
+
+    Called inside the request so the catch-up payload can use the database;
+    the iterable itself only reads from the subscriber queue. Closing it
+    (the server does, when the client goes away) frees the client's slot.
+    """
+    sub = _broadcaster.subscribe()
+    if sub is None:
+        return None
+    snap = catalog.get_snapshot()
+    _broadcaster.seed(snap)
+    if last_event_id is not None:
+        first = changefeed.changes_since(snap, last_event_id)
+    else:
+        first = {'version': snap.change_version, 'full': False, 'changes': []}
+
+    def generate():
+        yield f'retry: {RETRY_MS}\n\n'
+        yield format_event(first, event='hello' if last_event_id is None else 'catalog')
+        while True:
+            try:
+                message = sub.queue.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if message is _DROPPED:
+                return
+            yield message
+
+    # a callback rather than try/finally: a generator closed before its first
+    # chunk never runs its finally block, and would keep the slot forever
+    return ClosingIterator(generate(), lambda: _broadcaster.unsubscribe(sub))
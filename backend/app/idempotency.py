@@ -0,0 +1,194 @@
+"""Idempotency-Key support for POST endpoints that create orders.
+
+The first request with a given key runs normally and its response is stored
+(idempotency_keys table, plus a small in-process LRU); retries with the same
+key get that response replayed instead of creating another Order or Stripe
+session. A duplicate that arrives while the first is still running waits for
+it (an in-process event for the same worker, short DB polls across workers)
+and then replays, or gets 409 if it takes too long.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+
+from . import db, dbtasks
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+# how long a stored response can be replayed
+TTL = timedelta(hours=int(os.getenv('IDEMPOTENCY_TTL_HOURS', '24')))
+# an in-progress claim older than this is treated as abandoned (worker died)
+LOCK_TIMEOUT = timedelta(seconds=60)
+# how long a concurrent duplicate waits for the first request to finish
+WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '10'))
+POLL_SECONDS = 0.1
+LRU_SIZE = 1024
+# expired rows are purged at most this often per worker
+PURGE_INTERVAL = 300
+
+_lock = threading.Lock()
+_lru = OrderedDict()      # (scope, key) -> (request_hash, code, body, expires_at)
+_inflight = {}            # (scope, key) -> threading.Event
+
+
+def _remember(ck, entry):
+    with _lock:
+        _lru[ck] = entry
+        _lru.move_to_end(ck)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def _cached(ck):
+    with _lock:
+        entry = _lru.get(ck)
+        if entry is not None and entry[3] <= datetime.utcnow():
+            del _lru[ck]
+            return None
+        return entry
+
+
+def _replay(entry, request_hash):
+    if entry[0] != request_hash:
+        return jsonify({'error': f'{HEADER} was already used with a different request'}), 422
+    resp = Response(entry[2], status=entry[1], mimetype='application/json')
+    resp.headers['Idempotent-Replayed'] = 'true'
+    return resp
+
+
+def purge_expired():
+    """Delete expired keys; returns the number of rows removed."""
+    n = IdempotencyKey.query.filter(IdempotencyKey.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    return n
+
+
+_maybe_purge = dbtasks.throttled(PURGE_INTERVAL, 'idempotency purge')(purge_expired)
+
+
+def _claim(scope, key, request_hash):
+    """Insert an in-progress row. Returns None if claimed, else the existing row."""
+    now = datetime.utcnow()
+    row = IdempotencyKey(scope=scope, key=key, request_hash=request_hash, status='in_progress',
+                         created_at=now, expires_at=now + TTL)
+    db.session.add(row)
+    try:
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+    existing = IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+    if existing is None:
+        return _claim(scope, key, request_hash)
+    stale = existing.status == 'in_progress' and existing.created_at < now - LOCK_TIMEOUT
+    if existing.expires_at <= now or stale:
+        # expired or abandoned: take it over
+        taken = (IdempotencyKey.query
+                 .filter_by(id=existing.id, status=existing.status, created_at=existing.created_at)
+                 .update({'request_hash': request_hash, 'status': 'in_progress', 'response_code': None,
+                          'response_body': None, 'created_at': now, 'expires_at': now + TTL},
+                         synchronize_session=False))
+        db.session.commit()
+        if taken:
+            return None
+        existing = IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+    return existing
+
+
+def _wait_for(scope, key):
+    """Poll until another worker completes the key; returns the row or None on timeout."""
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        db.session.expire_all()
+        row = IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+        if row is None:
+            return None
+        if row.status == 'completed':
+            return row
+    return None
+
+
+def _entry(row):
+    return (row.request_hash, row.response_code, row.response_body, row.expires_at)
+
+
+def idempotent(fn):
+    """Make a view replay its first response for repeated Idempotency-Key values."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return fn(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'error': f'{HEADER} must be at most 255 characters'}), 400
+        scope = request.endpoint
+        ck = (scope, key)
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+
+        entry = _cached(ck)
+        if entry is not None:
+            return _replay(entry, request_hash)
+
+        # duplicates inside this worker wait on the first one without polling the DB
+        with _lock:
+            event = _inflight.get(ck)
+            owner = event is None
+            if owner:
+                event = _inflight[ck] = threading.Event()
+        if not owner:
+            event.wait(WAIT_SECONDS)
+            entry = _cached(ck)
+            if entry is not None:
+                return _replay(entry, request_hash)
+            return jsonify({'error': 'a request with this Idempotency-Key is still in progress'}), 409
+
+        try:
+            _maybe_purge()
+            existing = _claim(scope, key, request_hash)
+            if existing is not None:
+                if existing.status != 'completed':
+                    existing = _wait_for(scope, key)
+                if existing is None:
+                    return jsonify({'error': 'a request with this Idempotency-Key is still in progress'}), 409
+                entry = _entry(existing)
+                _remember(ck, entry)
+                return _replay(entry, request_hash)
+
+            try:
+                resp = make_response(fn(*args, **kwargs))
+            except Exception:
+                db.session.rollback()
+                IdempotencyKey.query.filter_by(scope=scope, key=key).delete(synchronize_session=False)
+                db.session.commit()
+                raise
+
+            if resp.status_code >= 500:
+                # server errors are not final; let the client retry for real
+                IdempotencyKey.query.filter_by(scope=scope, key=key).delete(synchronize_session=False)
+                db.session.commit()
+                return resp
+
+            body = resp.get_data(as_text=True)
+            expires_at = datetime.utcnow() + TTL
+            IdempotencyKey.query.filter_by(scope=scope, key=key).update(
+                {'status': 'completed', 'response_code': resp.status_code,
+                 'response_body': body, 'expires_at': expires_at},
+                synchronize_session=False)
+            db.session.commit()
+            _remember(ck, (request_hash, resp.status_code, body, expires_at))
+            return resp
+        finally:
+            with _lock:
+                _inflight.pop(ck, None)
+            event.set()
+
+    return wrapper
@@ -0,0 +1,213 @@
+"""Small database-backed job queue.
+
+Jobs are rows in the `jobs` table, so enqueueing happens in the caller's
+transaction (an order and the job that creates its Stripe session commit or
+roll back together). Workers (scripts/run_worker.py) claim ready jobs by
+marking them running with a visibility timeout; a job whose worker dies
+becomes claimable again once `locked_until` passes. Failures are retried
+with exponential backoff and jitter up to `max_attempts`.
+
+On PostgreSQL the claim uses FOR UPDATE SKIP LOCKED so workers never block on
+each other; elsewhere a conditional UPDATE per row decides the race.
+"""
+import json
+import os
+import random
+import signal
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+
+from . import db, dbtasks
+from .models import Job
+
+# how long a claimed job stays invisible to other workers
+VISIBILITY_TIMEOUT = timedelta(seconds=int(os.getenv('JOB_VISIBILITY_TIMEOUT', '60')))
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0     # seconds before the first retry
+BACKOFF_MAX = 300.0
+# done and failed jobs are deleted after this long
+RETENTION = timedelta(days=int(os.getenv('JOB_RETENTION_DAYS', '7')))
+PURGE_INTERVAL = 3600
+
+_handlers = {}
+_pollers = []
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying cannot help (bad input, auth errors)."""
+
+
+def handler(kind, on_failure=None):
+    """Register `fn(payload)` for jobs of `kind`.
+
+    `on_failure(payload, error)` runs once when the job gives up for good.
+    """
+    def register(fn):
+        _handlers[kind] = (fn, on_failure)
+        return fn
+    return register
+
+
+def poller(fn):
+    """Register `fn()` to be called by every worker loop, e.g. to drain an inbox table.
+
+    It returns how many items it handled; the loop only sleeps when all are idle.
+    """
+    _pollers.append(fn)
+    return fn
+
+
+def enqueue(kind, payload, delay=0, max_attempts=MAX_ATTEMPTS):
+    """Add a job to the current session; it is visible once the caller commits."""
+    job = Job(kind=kind, payload=json.dumps(payload), status='queued', attempts=0,
+              max_attempts=max_attempts, run_at=datetime.utcnow() + timedelta(seconds=delay))
+    db.session.add(job)
+    return job
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts` (full jitter on the upper half)."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim(limit=1, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Claim up to `limit` ready jobs for this worker and return them."""
+    now = datetime.utcnow()
+    ready = or_(and_(Job.status == 'queued', Job.run_at <= now),
+                and_(Job.status == 'running', Job.locked_until < now))
+    claimed = dbtasks.claim(Job, ready, Job.run_at, limit, lambda attempts: {
+        'status': 'running', 'attempts': attempts + 1, 'started_at': now,
+        'locked_until': now + visibility_timeout})
+    if not claimed:
+        return []
+    return Job.query.filter(Job.id.in_(claimed)).order_by(Job.run_at).all()
+
+
+def purge_finished():
+    """Delete done/failed jobs past the retention window; returns rows removed."""
+    cutoff = datetime.utcnow() - RETENTION
+    n = (Job.query.filter(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff)
+         .delete(synchronize_session=False))
+    db.session.commit()
+    return n
+
+
+def _finish(job, values):
+    done = (Job.query
+            .filter(Job.id == job.id, Job.status == 'running', Job.attempts == job.attempts)
+            .update(values, synchronize_session=False))
+    db.session.commit()
+    return bool(done)
+
+
+def run_job(job):
+    """Run one claimed job; returns 'done', 'retry', 'failed' or 'lost'."""
+    entry = _handlers.get(job.kind)
+    payload = json.loads(job.payload)
+    error, permanent = None, False
+    if entry is None:
+        error, permanent = f'no handler for job kind {job.kind!r}', True
+    elif job.attempts > job.max_attempts:
+        # re-claimed after its last attempt timed out
+        error, permanent = 'visibility timeout expired on the last attempt', True
+    else:
+        try:
+            entry[0](payload)
+        except PermanentError as e:
+            db.session.rollback()
+            error, permanent = str(e), True
+        except Exception as e:
+            db.session.rollback()
+            error = f'{type(e).__name__}: {e}'
+
+    now = datetime.utcnow()
+    if error is None:
+        return 'done' if _finish(job, {'status': 'done', 'finished_at': now, 'locked_until': None,
+                                       'last_error': None}) else 'lost'
+    if not permanent and job.attempts < job.max_attempts:
+        run_at = now + timedelta(seconds=backoff(job.attempts))
+        return 'retry' if _finish(job, {'status': 'queued', 'run_at': run_at, 'locked_until': None,
+                                        'last_error': error}) else 'lost'
+    if not _finish(job, {'status': 'failed', 'finished_at': now, 'locked_until': None, 'last_error': error}):
+        return 'lost'
+    if entry is not None and entry[1] is not None:
+        try:
+            entry[1](payload, error)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARNING] on_failure for job {job.id} failed: {e}")
+    return 'failed'
+
+
+def metrics(window=timedelta(hours=1)):
+    """Queue depth per status, age of the oldest ready job and recent latencies."""
+    now = datetime.utcnow()
+    depth = dict(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+    oldest = (db.session.query(func.min(Job.run_at))
+              .filter(Job.status == 'queued', Job.run_at <= now).scalar())
+    recent = (db.session.query(Job.created_at, Job.started_at, Job.finished_at)
+              .filter(Job.status == 'done', Job.finished_at >= now - window)
+              .order_by(Job.finished_at.desc()).limit(1000).all())
+    total = sorted((f - c).total_seconds() for c, s, f in recent)
+
+    def pct(p):
+        return round(total[min(len(total) - 1, int(p * len(total)))], 3) if total else None
+
+    return {
+        'depth': {status: depth.get(status, 0) for status in ('queued', 'running', 'done', 'failed')},
+        'oldest_ready_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0,
+        'recent_done': len(total),
+        'latency_seconds': {'p50': pct(0.5), 'p95': pct(0.95), 'max': pct(1.0)},
+        'run_seconds_avg': (round(sum((f - s).total_seconds() for c, s, f in recent) / len(recent), 3)
+                            if recent else None),
+    }
+
+
+def work(app, batch=10, idle_sleep=0.5, threads=1, once=False):
+    """Process jobs until SIGINT/SIGTERM (or until the queue is empty with once=True)."""
+    stop = threading.Event()
+    counts = {'done': 0, 'retry': 0, 'failed': 0, 'lost': 0}
+    counts_lock = threading.Lock()
+
+    def loop():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    claimed = claim(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[WARNING] job claim failed: {e}")
+                    claimed = []
+                for job in claimed:
+                    outcome = run_job(job)
+                    with counts_lock:
+                        counts[outcome] += 1
+                polled = 0
+                for fn in _pollers:
+                    try:
+                        polled += fn()
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"[WARNING] {fn.__module__}.{fn.__name__} failed: {e}")
+                db.session.remove()
+                if not claimed and not polled:
+                    if once:
+                        return
+                    stop.wait(idle_sleep)
+
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+    workers = [threading.Thread(target=loop, name=f'job-worker-{i}', daemon=True) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        while t.is_alive():
+            t.join(1)
+    return counts
+
+
+poller(dbtasks.throttled(PURGE_INTERVAL, 'jobs purge')(purge_finished))
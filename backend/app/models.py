@@ -7,8 +7,15 @@ class Category(db.Model):
     name = db.Column(db.String(128), nullable=False)
     position = db.Column(db.Integer, default=0)
 
+    # passive_deletes keeps the old delete behaviour (no child load / nulling)
+    items = db.relationship('MenuItem', backref='category', order_by='MenuItem.id', lazy='select', passive_deletes=True)
+
 class MenuItem(db.Model):
     __tablename__ = 'menu_items'
+    # supports the filtered catalog query (category / availability / price range)
+    __table_args__ = (
+        db.Index('ix_menu_items_category_available_price', 'category_id', 'available', 'price_cents'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
     description = db.Column(db.String(512))
@@ -18,9 +25,18 @@ class MenuItem(db.Model):
     available = db.Column(db.Boolean, default=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # mirror in Stripe, maintained by stripe_sync.py
+    stripe_product_id = db.Column(db.String(255))
+    stripe_price_id = db.Column(db.String(255))
+    stripe_price_cents = db.Column(db.Integer)   # unit_amount of stripe_price_id
+    stripe_sync_hash = db.Column(db.String(40))  # product fields last pushed
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # reconciliation pages through pending orders by id
+        db.Index('ix_orders_status_id', 'status', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     customer_name = db.Column(db.String(128))
     customer_email = db.Column(db.String(128))
@@ -28,6 +44,13 @@ class Order(db.Model):
     total_cents = db.Column(db.Integer)
     status = db.Column(db.String(64), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # filled in by the checkout-session job once Stripe answers
+    stripe_session_id = db.Column(db.String(255))
+    stripe_session_url = db.Column(db.String(1024))
+    # secret in the statusUrl that polls for the session (checkout_sessions.py)
+    checkout_token = db.Column(db.String(64))
+
+    items = db.relationship('OrderItem', backref='order', order_by='OrderItem.id', lazy='select', passive_deletes=True)
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
@@ -70,8 +93,93 @@ class Reservation(db.Model):
 
 class Promotion(db.Model):
     __tablename__ = 'promotions'
+    __table_args__ = (
+        db.Index('ix_promotions_menu_item_active', 'menu_item_id', 'active'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'), nullable=False)
     percent = db.Column(db.Integer, nullable=False, default=0)  # discount percent (0-100)
     active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class CatalogChange(db.Model):
+    """Append-only log of catalog mutations (trimmed by changefeed.purge); the id doubles as the change-feed version."""
+    __tablename__ = 'catalog_changes'
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(32), nullable=False)  # 'category' | 'item' | 'promotion'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(16), nullable=False)  # 'created' | 'updated' | 'deleted'
+    # for promotions: the menu item whose discount changed (kept after the promotion is deleted)
+    menu_item_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class IdempotencyKey(db.Model):
+    """First response to a request carrying an Idempotency-Key, replayed for retries."""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(64), nullable=False)  # endpoint name
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='in_progress')  # 'in_progress' | 'completed'
+    response_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class Job(db.Model):
+    """Database-backed job queue entry (see jobs.py)."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued | running | done | failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class StripeEvent(db.Model):
+    """Webhook inbox: raw Stripe events, one row per event id (see webhooks.py)."""
+    __tablename__ = 'stripe_events'
+    __table_args__ = (
+        db.Index('ix_stripe_events_status_received_at', 'status', 'received_at'),
+    )
+    id = db.Column(db.String(255), primary_key=True)  # Stripe event id (evt_...)
+    type = db.Column(db.String(128), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # raw JSON as delivered
+    created = db.Column(db.Integer)  # Stripe's event timestamp, orders processing
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending | processing | processed | failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+
+
+class AirtelNotification(db.Model):
+    """Airtel payment callbacks, one row per transaction (see airtel_notifications.py)."""
+    __tablename__ = 'airtel_notifications'
+    transaction_id = db.Column(db.String(64), primary_key=True)  # our transaction.id, e.g. order-42
+    partner_code = db.Column(db.String(64))
+    airtel_money_id = db.Column(db.String(64))
+    status_code = db.Column(db.String(16))  # TS (success) | TF (failed) | ...
+    message = db.Column(db.Text)
+    payload = db.Column(db.Text, nullable=False)  # raw JSON as delivered
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), index=True)
+    # signed by a known partner; unverified callbacks never change the order
+    verified = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,82 @@
+"""Set-based order status updates.
+
+Webhook batches and reconciliation runs produce many (order_id, status)
+transitions at once. Instead of loading and committing each order, they are
+grouped by target status into `UPDATE orders SET status=... WHERE id IN (...)`
+statements and committed once.
+"""
+from collections import defaultdict
+
+from sqlalchemy import case, literal, or_, update
+
+from . import db
+from .models import Order
+
+# ids per UPDATE statement (keeps well under driver parameter limits)
+CHUNK_SIZE = 500
+
+# statuses an order may move to each target from; a late or duplicate event
+# (say, an unpaid "completed" arriving after the paid one) is ignored instead
+# of undoing a newer state. Targets not listed here are applied unconditionally.
+ALLOWED_FROM = {
+    'pending': ('pending',),
+    'completed': ('pending', 'failed'),
+    'failed': ('pending',),
+}
+
+# stands for any status the graph above doesn't mention (or NULL)
+_OTHER = None
+
+
+def _fold(targets, status):
+    """Status an order in `status` ends in after `targets`, applied in order."""
+    for target in targets:
+        allowed = ALLOWED_FROM.get(target)
+        if allowed is None or status in allowed:
+            status = target
+    return status
+
+
+def apply(transitions, commit=True):
+    """Apply [(order_id, status)] as if one at a time, in order.
+
+    Each order's transitions are folded through ALLOWED_FROM for every status
+    it could currently be in, so a batch ends exactly where applying the
+    events one by one would (a paid "completed" followed by a stale
+    "pending" stays completed). Orders with the same outcome share one
+    `UPDATE ... SET status = CASE status ... END` per chunk.
+
+    Returns {status: rows changed}. With commit=False the caller commits (e.g.
+    together with marking webhook events processed).
+    """
+    sequences = defaultdict(list)
+    for order_id, status in transitions:
+        sequences[int(order_id)].append(status)
+    known = set(ALLOWED_FROM).union(*ALLOWED_FROM.values(), *sequences.values())
+
+    # outcome: ((from, to) for statuses that change, to for any other status)
+    by_outcome = defaultdict(list)
+    for order_id, targets in sequences.items():
+        moves = tuple(sorted((start, end) for start in known if (end := _fold(targets, start)) != start))
+        other = _fold(targets, _OTHER)
+        if moves or other is not _OTHER:
+            by_outcome[(moves, other)].append(order_id)
+
+    updated = defaultdict(int)
+    for (moves, other), ids in by_outcome.items():
+        ids.sort()
+        whens = dict(moves)
+        matches = Order.status.in_(whens)
+        if other is not _OTHER:
+            matches = or_(matches, Order.status.is_(None), Order.status.not_in(known))
+        default = Order.status if other is _OTHER else literal(other)
+        new_status = case(whens, value=Order.status, else_=default) if whens else default
+        for start in range(0, len(ids), CHUNK_SIZE):
+            stmt = (update(Order).where(Order.id.in_(ids[start:start + CHUNK_SIZE]), matches)
+                    .values(status=new_status).returning(Order.status)
+                    .execution_options(synchronize_session=False))
+            for (status,) in db.session.execute(stmt):
+                updated[status] += 1
+    if commit:
+        db.session.commit()
+    return dict(updated)
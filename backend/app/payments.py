@@ -0,0 +1,154 @@
+"""Stripe-facing routes: hosted checkout for a Stripe price and webhooks.
+
+These used to live in a separate Flask app (stripe-sample-code/server.py)
+with its own engine and pool; as a blueprint they share the main app's
+connection pool, config and startup.
+"""
+import json
+import os
+
+import stripe
+from flask import Blueprint, current_app, jsonify, make_response, redirect, request
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from . import db, stripe_client, webhooks
+
+payments_bp = Blueprint('payments', __name__)
+
+
+# Helper method to parse request body (JSON or form data)
+def parse_request_body():
+    data = {}
+
+    json_data = request.get_json(silent=True)
+    if json_data and isinstance(json_data, dict):
+        data.update(json_data)
+
+    if request.form:
+        data.update(request.form.to_dict())
+
+    if request.args:
+        data.update(request.args.to_dict())
+
+    return data
+
+
+@payments_bp.route('/create-checkout-session', methods=['POST'])
+def create_checkout_session():
+    data = parse_request_body()
+    price_id = data.get('priceId')
+    if not price_id:
+        return jsonify({'error': 'priceId is required'}), 400
+
+    # Get the price's type from Stripe
+    price = stripe.Price.retrieve(price_id)
+    price_type = price.type
+    mode = 'subscription' if price_type == 'recurring' else 'payment'
+
+    checkout_session = stripe.checkout.Session.create(
+      line_items=[
+        {
+          'price': price_id,
+          'quantity': 1
+        }
+      ],
+      mode=mode,
+      # Defines where Stripe will redirect a customer after successful payment
+      success_url=f"{os.getenv('DOMAIN')}/done?session_id={{CHECKOUT_SESSION_ID}}",
+      # Defines where Stripe will redirect if a customer cancels payment
+      cancel_url=f"{os.getenv('DOMAIN')}",
+    )
+
+    return make_response(redirect(checkout_session.url, code=303))
+
+
+@payments_bp.route('/webhook', methods=['POST'])
+def webhook_received():
+    """Verify a Stripe webhook, store it in the inbox and acknowledge.
+
+    Order updates happen in the worker (webhooks.drain() empties the
+    stripe_events table), so this stays fast during payment bursts and
+    redeliveries of the same event id are acknowledged without reprocessing.
+    """
+    endpoint_secret = current_app.config.get('STRIPE_WEBHOOK_SECRET')
+
+    if endpoint_secret:
+        sig_header = request.headers.get('stripe-signature')
+        try:
+            stripe.Webhook.construct_event(
+                request.data, sig_header, endpoint_secret
+            )
+        except (ValueError, stripe.error.SignatureVerificationError) as e:
+            current_app.logger.info('⚠️  Webhook signature verification failed.')
+            return jsonify({'error': str(e)}), 400
+    elif current_app.config.get('STRIPE_WEBHOOK_ALLOW_UNSIGNED'):
+        # local testing only (stripe_stub, curl): accept events without a signature
+        current_app.logger.info('[WARNING] Webhook signature verification disabled - for testing only!')
+    else:
+        # anyone could mark orders paid; refuse, and Stripe retries once a secret is set
+        print("[WARNING] STRIPE_WEBHOOK_SECRET is not set - rejecting webhook event")
+        return jsonify({'error': 'webhook signing secret not configured'}), 503
+
+    try:
+        event = json.loads(request.data)
+        event_id, event_type = event['id'], event['type']
+    except (ValueError, KeyError, TypeError):
+        return jsonify({'error': 'malformed event'}), 400
+
+    try:
+        stored = webhooks.receive(event_id, event_type, request.get_data(as_text=True), event.get('created'))
+    except (OperationalError, InterfaceError) as e:
+        # not stored: let Stripe retry once the database is reachable
+        db.session.rollback()
+        print(f"[WARNING] Database unavailable - event {event_id} not stored: {e}")
+        return jsonify({'error': 'database unavailable'}), 503
+    print(f"[INFO] Received webhook event: {event_type} ({event_id}){'' if stored else ' - duplicate'}")
+
+    # Return a 200 response to acknowledge receipt of the event
+    return jsonify({'status': 'success', 'duplicate': not stored})
+
+
+_thin_client = None
+
+
+def _stripe_client():
+    """StripeClient (stripe >= 13) sharing the pooled HTTP client, or None."""
+    global _thin_client
+    StripeClient = getattr(stripe, 'StripeClient', None)
+    if StripeClient is None or not stripe.api_key:
+        return None
+    if _thin_client is None:
+        _thin_client = StripeClient(stripe.api_key, http_client=stripe.default_http_client,
+                                    max_network_retries=stripe_client.MAX_NETWORK_RETRIES)
+    return _thin_client
+
+
+@payments_bp.route('/thin-webhook', methods=['POST'])
+def thin_webhook():
+    # Replace this endpoint secret with your endpoint's unique secret
+    # If you are testing with the CLI, find the secret by running 'stripe listen'
+    # If you are using an endpoint defined with the API or dashboard, look in your webhook settings
+    # at https://dashboard.stripe.com/webhooks
+    thin_endpoint_secret = current_app.config.get('STRIPE_THIN_WEBHOOK_SECRET') or ''
+    payload = request.data
+    sig_header = request.headers.get('Stripe-Signature')
+
+    client = _stripe_client()
+    if client is None or not hasattr(client, 'parse_event_notification'):
+        return jsonify({'error': 'thin events need a configured stripe>=13 client'}), 501
+
+    try:
+        event_notif = client.parse_event_notification(
+            payload, sig_header, thin_endpoint_secret
+        )
+    except Exception as e:
+        current_app.logger.info(f"⚠️  Thin webhook signature verification failed: {e}")
+        return jsonify({'error': 'bad signature'}), 400
+
+    if event_notif.type == "v2.account.created":
+        event_notif.fetch_related_object()
+        event_notif.fetch_event()
+    else:
+        current_app.logger.info(f'Unhandled event type {event_notif.type}')
+
+    return jsonify({'status': 'success'})
@@ -0,0 +1,122 @@
+"""Cart pricing shared by checkout, Stripe checkout and cart quotes.
+
+Prices come from the effective-price table built with each catalog snapshot
+(base price with any active promotion applied), so pricing a cart is one
+dictionary lookup per line and always matches what /api/menu advertises.
+"""
+from . import catalog
+
+
+class PricingError(ValueError):
+    """The cart payload itself is malformed (not a pricing outcome)."""
+
+
+def effective_price(price_cents, discount_percent):
+    """Apply a percent discount, rounding half up like the frontend's Math.round."""
+    if not discount_percent:
+        return price_cents
+    return (price_cents * (100 - discount_percent) + 50) // 100
+
+
+def build_price_table(items_by_id):
+    """menu_item_id -> effective_price_cents for every item in the snapshot."""
+    return {
+        item_id: effective_price(item['price_cents'], item['discount_percent'])
+        for item_id, item in items_by_id.items()
+    }
+
+
+def parse_cart(items):
+    """Validate raw cart lines into [(menu_item_id, qty)]."""
+    if not isinstance(items, list):
+        raise PricingError('items must be a list')
+    lines = []
+    for it in items:
+        try:
+            menu_item_id = int(it.get('menu_item_id'))
+            qty = int(it.get('qty', 1))
+        except (TypeError, ValueError, AttributeError):
+            raise PricingError('Each item needs an integer menu_item_id and qty')
+        if qty < 1:
+            raise PricingError(f"Invalid qty for menu item {menu_item_id}")
+        lines.append((menu_item_id, qty))
+    return lines
+
+
+class Quote:
+    """A priced cart. `missing` lists ids not in the catalog."""
+
+    def __init__(self, lines, missing, unavailable, stripe_prices=None):
+        self.lines = lines
+        self.missing = missing
+        self.unavailable = unavailable
+        # Stripe price ids from the same snapshot (not part of the public quote)
+        self.stripe_prices = stripe_prices or {}
+        self.subtotal_cents = sum(l['base_price_cents'] * l['qty'] for l in lines)
+        self.total_cents = sum(l['line_total_cents'] for l in lines)
+        self.discount_cents = self.subtotal_cents - self.total_cents
+
+    def to_dict(self):
+        return {
+            'lines': self.lines,
+            'subtotal_cents': self.subtotal_cents,
+            'discount_cents': self.discount_cents,
+            'total_cents': self.total_cents,
+            'missing': self.missing,
+            'unavailable': self.unavailable,
+        }
+
+
+def price_cart(items, snap=None):
+    """Price raw cart lines against the current catalog snapshot."""
+    wanted = parse_cart(items)
+    snap = snap or catalog.get_snapshot()
+    prices = snap.prices
+    lines, missing, unavailable = [], [], []
+    for menu_item_id, qty in wanted:
+        item = snap.items_by_id.get(menu_item_id)
+        if item is None:
+            missing.append(menu_item_id)
+            continue
+        unit = prices[menu_item_id]
+        if not item['available']:
+            unavailable.append(menu_item_id)
+        lines.append({
+            'menu_item_id': menu_item_id,
+            'name': item['name'],
+            'description': item['description'],
+            'qty': qty,
+            'base_price_cents': item['price_cents'],
+            'discount_percent': item['discount_percent'],
+            'unit_price_cents': unit,
+            'line_total_cents': unit * qty,
+            'available': item['available'],
+        })
+    return Quote(lines, missing, unavailable, snap.stripe_prices)
+
+
+def stripe_line_items(quote, currency='usd'):
+    """Stripe Checkout `line_items` for a quote, charging the effective prices.
+
+    Lines whose item is mirrored in Stripe at exactly this amount send the
+    price id (see stripe_sync.py); the rest fall back to inline price_data.
+    """
+    items = []
+    for line in quote.lines:
+        price_id, amount = quote.stripe_prices.get(line['menu_item_id'], (None, None))
+        if price_id and amount == line['unit_price_cents']:
+            items.append({'price': price_id, 'quantity': line['qty']})
+            continue
+        items.append({
+            # For Stripe, price is in cents
+            'price_data': {
+                'currency': currency,
+                'product_data': {
+                    'name': line['name'],
+                    'description': line['description'],
+                },
+                'unit_amount': line['unit_price_cents'],
+            },
+            'quantity': line['qty'],
+        })
+    return items
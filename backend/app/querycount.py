@@ -0,0 +1,66 @@
+"""Per-request SQL query counting and query budgets for listing endpoints.
+
+Views declare the most queries they may issue with `@query_budget(n)`. When
+the app runs with ENFORCE_QUERY_BUDGETS (tests, CI), a request that goes over
+its budget raises `QueryBudgetExceeded`, so an N+1 loop fails as soon as the
+data grows instead of silently slowing the endpoint down.
+"""
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may execute."""
+    def decorator(fn):
+        fn.query_budget = max_queries
+        return fn
+    return decorator
+
+
+@contextmanager
+def count_queries(engine):
+    """Count statements executed on `engine` inside the block.
+
+    Usage:
+        with count_queries(db.engine) as counter:
+            client.get('/api/admin/orders')
+        assert counter['count'] <= 2
+    """
+    counter = {'count': 0, 'statements': []}
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+        counter['statements'].append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _on_execute)
+
+
+def init_app(app, db):
+    if not app.config.get('ENFORCE_QUERY_BUDGETS'):
+        return
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _on_execute)
+
+    @app.after_request
+    def _check_query_budget(response):
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        used = g.get('query_count', 0)
+        if budget is not None and used > budget:
+            raise QueryBudgetExceeded(f'{request.endpoint} executed {used} queries (budget {budget})')
+        return response
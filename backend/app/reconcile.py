@@ -0,0 +1,127 @@
+"""Payment reconciliation for orders stuck in 'pending'.
+
+Abandoned Stripe sessions, webhooks that never arrived and lost Airtel
+callbacks all leave orders pending forever. reconcile() pages through pending
+orders by id (keyset, on ix_orders_status_id), asks the provider about each
+page concurrently on a bounded pool, and applies what it learns with
+order_status.apply(), one commit per page:
+
+  Stripe (orders with a checkout session): complete + paid -> completed,
+      expired -> failed, open -> unchanged
+  Airtel (the rest; transaction id "order-<id>"): TS -> completed,
+      TF -> failed, unknown transaction or in progress -> unchanged
+
+Run it with scripts/reconcile_payments.py, against the real APIs or the
+local stubs.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import stripe
+
+from . import db, order_status, stripe_client
+from .airtel_client import AirtelClient, build_session
+from .airtel_notifications import ORDER_STATUS as AIRTEL_ORDER_STATUS, transaction_id
+from .models import Order
+
+BATCH_SIZE = int(os.getenv('RECONCILE_BATCH', '200'))
+# provider calls in flight; Stripe calls share the pooled Stripe client
+CONCURRENCY = min(int(os.getenv('RECONCILE_CONCURRENCY', '8')), stripe_client.POOL_SIZE)
+# leave recent orders alone: their customer may still be paying
+MIN_AGE = timedelta(seconds=int(os.getenv('RECONCILE_MIN_AGE', '900')))
+
+
+def stripe_status(session_id):
+    """Order status implied by a Checkout session, or None to leave it."""
+    session = stripe.checkout.Session.retrieve(session_id)
+    if session.get('status') == 'complete' and session.get('payment_status') in ('paid', 'no_payment_required'):
+        return 'completed'
+    if session.get('status') == 'expired':
+        return 'failed'
+    return None
+
+
+def airtel_status(client, order_id):
+    """Order status implied by the order's Airtel transaction, or None to leave it."""
+    r = client.payment_status(transaction_id(order_id))
+    if r.status_code == 404:
+        return None  # never paid through Airtel
+    r.raise_for_status()
+    txn = ((r.json() or {}).get('data') or {}).get('transaction') or {}
+    return AIRTEL_ORDER_STATUS.get(txn.get('status'))
+
+
+def _check(airtel, order_id, session_id):
+    """(provider, status or None, error or None) for one order.
+
+    Any failure (provider down, token fetch, bad response) is returned as the
+    error rather than raised, so one order can't abort the whole run.
+    """
+    try:
+        if session_id:
+            if not stripe.api_key:
+                return 'skipped', None, None
+            return 'stripe', stripe_status(session_id), None
+        if airtel is None:
+            return 'skipped', None, None
+        return 'airtel', airtel_status(airtel, order_id), None
+    except Exception as e:
+        return ('stripe' if session_id else 'airtel'), None, f'{type(e).__name__}: {e}'
+
+
+def pending_page(after_id, limit, cutoff):
+    """[(id, stripe_session_id)] of pending orders past `after_id`, oldest first."""
+    return (db.session.query(Order.id, Order.stripe_session_id)
+            .filter(Order.status == 'pending', Order.id > after_id, Order.created_at < cutoff)
+            .order_by(Order.id).limit(limit).all())
+
+
+def reconcile(batch_size=BATCH_SIZE, concurrency=CONCURRENCY, min_age=MIN_AGE, limit=None,
+              airtel=None, use_airtel=True, report=None):
+    """Check pending orders older than `min_age` with their provider.
+
+    `report(metrics)` is called after each page. Returns the metrics:
+    scanned, checked per provider, updated per status, unchanged, errors,
+    elapsed and scanned_per_second.
+    """
+    if use_airtel and airtel is None:
+        airtel = AirtelClient(session=build_session(concurrency))
+    elif not use_airtel:
+        airtel = None
+    cutoff = datetime.utcnow() - min_age
+    metrics = {'scanned': 0, 'checked': {'stripe': 0, 'airtel': 0}, 'updated': {}, 'unchanged': 0,
+               'errors': 0, 'first_error': None, 'elapsed': 0.0, 'scanned_per_second': 0.0}
+    start = time.perf_counter()
+    after_id = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while limit is None or metrics['scanned'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - metrics['scanned'])
+            page = pending_page(after_id, size, cutoff)
+            db.session.commit()  # don't hold a read transaction open during provider calls
+            if not page:
+                break
+            after_id = page[-1][0]
+            results = pool.map(lambda row: (row[0],) + _check(airtel, *row), page)
+            transitions = []
+            for order_id, provider, status, error in results:
+                if provider in metrics['checked']:
+                    metrics['checked'][provider] += 1
+                if error:
+                    metrics['errors'] += 1
+                    metrics['first_error'] = metrics['first_error'] or f'order {order_id}: {error}'
+                elif status:
+                    transitions.append((order_id, status))
+            applied = order_status.apply(transitions)
+            for status, count in applied.items():
+                metrics['updated'][status] = metrics['updated'].get(status, 0) + count
+            metrics['scanned'] += len(page)
+            metrics['unchanged'] = metrics['scanned'] - sum(metrics['updated'].values())
+            metrics['elapsed'] = time.perf_counter() - start
+            metrics['scanned_per_second'] = metrics['scanned'] / metrics['elapsed']
+            if report:
+                report(metrics)
+    metrics['elapsed'] = time.perf_counter() - start
+    metrics['scanned_per_second'] = metrics['scanned'] / metrics['elapsed'] if metrics['elapsed'] else 0.0
+    return metrics
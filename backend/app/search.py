@@ -0,0 +1,147 @@
+"""In-process full-text index over menu item names and descriptions.
+
+Text is lowercased and accent-folded ("Crème brûlée" -> "creme brulee") and
+split into word tokens. Each token maps to the sorted ids of the items
+containing it; a sorted token list gives prefix lookups by bisection, so
+typeahead queries ("sal", "esp") touch a handful of postings rather than
+the table.
+
+Query cost is bounded whatever the catalog size: a term shorter than
+MIN_PREFIX only matches whole tokens, a prefix expands to at most
+MAX_EXPANSION tokens, and only the first CANDIDATES matching items (those
+with a term in their name first, then by id) are ranked.
+
+An index is immutable once built. When a new catalog snapshot appears one
+thread builds its replacement (reusing the tokens of items whose text did
+not change) and swaps it in; searches never take a lock and keep using the
+previous index until the swap.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from itertools import chain
+
+from . import catalog
+
+# shorter terms match whole tokens only ("a" finds "a la carte", not every "a...")
+MIN_PREFIX = 2
+# most tokens one prefix term expands to, taken in lexical order
+MAX_EXPANSION = 64
+# matching items ranked per query
+CANDIDATES = 200
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Lowercase and strip accents."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text):
+    return _WORD.findall(normalize(text))
+
+
+class SearchIndex:
+    """Read-only index over one catalog snapshot; build with SearchIndex.build()."""
+
+    def __init__(self, snap, docs):
+        self.snap = snap
+        self._docs = docs        # item id -> (text key, tokens, name tokens)
+        postings, named = {}, {}
+        for item_id in sorted(docs):
+            _, tokens, name_tokens = docs[item_id]
+            for tok in tokens:
+                postings.setdefault(tok, []).append(item_id)
+            for tok in name_tokens:
+                named.setdefault(tok, []).append(item_id)
+        self._postings = {tok: tuple(ids) for tok, ids in postings.items()}  # token -> sorted ids
+        self._named = {tok: tuple(ids) for tok, ids in named.items()}        # same, name tokens only
+        self._tokens = tuple(sorted(postings))
+
+    @classmethod
+    def build(cls, snap, previous=None):
+        """Index `snap`, re-tokenizing only items whose text differs from `previous`."""
+        old = previous._docs if previous is not None else {}
+        docs = {}
+        for item_id, item in snap.items_by_id.items():
+            key = (item['name'], item['description'])
+            doc = old.get(item_id)
+            if doc is None or doc[0] != key:
+                name_tokens = frozenset(tokenize(item['name']))
+                doc = (key, name_tokens | frozenset(tokenize(item['description'])), name_tokens)
+            docs[item_id] = doc
+        return cls(snap, docs)
+
+    def _expand(self, term):
+        """Tokens a query term matches."""
+        if len(term) < MIN_PREFIX:
+            return (term,) if term in self._postings else ()
+        lo = bisect.bisect_left(self._tokens, term)
+        hi = bisect.bisect_left(self._tokens, term + '\U0010ffff', lo, min(lo + MAX_EXPANSION, len(self._tokens)))
+        return self._tokens[lo:hi]
+
+    def search(self, query, limit=20):
+        """Return item ids matching every query term (each term as a prefix)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        expansions = {t: frozenset(self._expand(t)) for t in terms}
+        if not all(expansions.values()):
+            return []
+        # walk the most selective term's postings; check every term per item
+        driver = min(terms, key=lambda t: sum(len(self._postings[tok]) for tok in expansions[t]))
+        merged = heapq.merge(*(self._postings[tok] for tok in sorted(expansions[driver])))
+        # items whose name contains a term exactly rank first, then by id; their
+        # streams come first so those items are always among the candidates
+        stream = chain(*(self._named.get(t, ()) for t in terms), merged)
+
+        candidates, seen = [], set()
+        for item_id in stream:
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            tokens = self._docs[item_id][1]
+            if all(not tokens.isdisjoint(exp) for exp in expansions.values()):
+                candidates.append(item_id)
+                if len(candidates) >= max(limit, CANDIDATES):
+                    break
+
+        def rank(item_id):
+            name_tokens = self._docs[item_id][2]
+            return (-sum(1 for t in terms if t in name_tokens), item_id)
+
+        return heapq.nsmallest(limit, candidates, key=rank)
+
+
+_build_lock = threading.Lock()
+_index = None  # SearchIndex of the newest snapshot seen; replaced, never mutated
+
+
+def _index_for(snap):
+    """The index for `snap`, or the previous one while another thread builds it."""
+    global _index
+    index = _index
+    if index is not None and index.snap.version >= snap.version:
+        return index
+    # only the very first search has nothing to fall back on and must wait
+    if not _build_lock.acquire(blocking=index is None):
+        return index
+    try:
+        index = _index
+        # a slower thread may arrive with an older snapshot; never go backwards
+        if index is None or index.snap.version < snap.version:
+            index = _index = SearchIndex.build(snap, index)
+        return index
+    finally:
+        _build_lock.release()
+
+
+def search_items(query, limit=20):
+    """Search the current catalog and return item dicts from the snapshot."""
+    snap = catalog.get_snapshot()
+    ids = _index_for(snap).search(query, limit)
+    return [snap.items_by_id[i] for i in ids if i in snap.items_by_id]
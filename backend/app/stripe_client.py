@@ -0,0 +1,58 @@
+"""Process-wide Stripe configuration, applied once by create_app().
+
+The stripe library keeps its settings in module globals, so every caller
+(API views, job handlers, the sample webhook server) shares them:
+
+- one requests.Session with a bounded keep-alive pool, so checkout traffic
+  reuses TLS connections to Stripe instead of handshaking per call;
+- explicit (connect, read) timeouts instead of the library's 80s default;
+- bounded automatic retries for network errors, 409s and 5xx (the library
+  adds an Idempotency-Key to retried POSTs, so retries are safe).
+
+STRIPE_API_BASE points the library at another server, e.g. the local stub in
+scripts/stripe_stub.py for offline benchmarks.
+"""
+import os
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', '20'))
+MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', '2'))
+# keep-alive connections kept per worker process; size it to the number of
+# threads that call Stripe at once (request threads + job worker threads)
+POOL_SIZE = int(os.getenv('STRIPE_POOL_SIZE', '10'))
+
+
+def build_http_client(pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+    """A RequestsClient whose session (and connection pool) is shared by all threads."""
+    session = requests.Session()
+    # retries are left to stripe's max_network_retries, which knows what is safe
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return stripe.RequestsClient(timeout=(connect_timeout, read_timeout), session=session)
+
+
+def configure(api_key=None, api_base=None, max_network_retries=MAX_NETWORK_RETRIES, http_client=None):
+    """Apply the shared Stripe settings; returns the HTTP client in use."""
+    if api_key:
+        stripe.api_key = api_key
+    if api_base:
+        stripe.api_base = api_base
+    stripe.max_network_retries = max_network_retries
+    stripe.default_http_client = http_client or build_http_client()
+    return stripe.default_http_client
+
+
+def init_app(app):
+    configure(app.config.get('STRIPE_SECRET_KEY'), app.config.get('STRIPE_API_BASE'))
+    if app.config.get('STRIPE_API_BASE'):
+        print(f"[INFO] Stripe API base overridden: {stripe.api_base}")
+    # Verify we're in test mode
+    if stripe.api_key and stripe.api_key.startswith('sk_test_'):
+        print("[INFO] Using Stripe TEST environment")
+    else:
+        print("[WARNING] Not using Stripe test keys!")
@@ -0,0 +1,163 @@
+"""Mirror menu items into Stripe Products and Prices.
+
+Each MenuItem gets one Stripe Product and a Price for its current effective
+price (promotion applied). Checkout then sends `{'price': id}` per line
+instead of inline price_data/product_data (see pricing.stripe_line_items).
+
+Only changed items are pushed: the product fields last sent are remembered as
+`stripe_sync_hash` and the amount of the current price as
+`stripe_price_cents`. Stripe prices are immutable, so a new amount means a new
+Price; old ones stay active so checkouts built from a slightly older catalog
+snapshot keep working, and an amount seen before reuses its Price through the
+idempotency key.
+
+Admin changes enqueue a `stripe.sync_catalog` job (coalesced, slightly
+delayed); scripts/sync_stripe_catalog.py runs a sync by hand.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+
+from . import catalog, db, jobs, pricing, stripe_client
+from .models import Job, MenuItem, Promotion
+
+JOB_KIND = 'stripe.sync_catalog'
+ARCHIVE_JOB_KIND = 'stripe.archive_product'
+CURRENCY = 'usd'
+# items whose Stripe calls run together and are saved in one bulk update
+BATCH_SIZE = int(os.getenv('STRIPE_SYNC_BATCH', '50'))
+# concurrent Stripe calls; stays within the shared connection pool
+CONCURRENCY = min(int(os.getenv('STRIPE_SYNC_CONCURRENCY', '4')), stripe_client.POOL_SIZE)
+# seconds a queued sync waits, so a burst of admin edits becomes one sync
+DELAY = 5
+
+
+class SyncError(Exception):
+    """Some items could not be synced; the rest were saved."""
+
+
+def _product_fields(item):
+    fields = {
+        'name': item['name'],
+        'active': bool(item['available']),
+        'metadata': {'menu_item_id': str(item['id'])},
+    }
+    if item['description']:
+        fields['description'] = item['description']
+    return fields
+
+
+def _fields_hash(fields):
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def pending_items(full=False):
+    """Items whose Stripe mirror is missing or out of date, as plain dicts (two queries)."""
+    promos = {p.menu_item_id: p.percent for p in Promotion.query.filter_by(active=True).all()}
+    out = []
+    for mi in MenuItem.query.order_by(MenuItem.id).all():
+        item = {
+            'id': mi.id,
+            'name': mi.name,
+            'description': mi.description,
+            'available': mi.available,
+            'unit_amount': pricing.effective_price(mi.price_cents, promos.get(mi.id)),
+            'stripe_product_id': mi.stripe_product_id,
+            'stripe_price_id': mi.stripe_price_id,
+            'stripe_price_cents': mi.stripe_price_cents,
+        }
+        item['fields'] = _product_fields(item)
+        item['hash'] = _fields_hash(item['fields'])
+        if (full or not mi.stripe_price_id or mi.stripe_sync_hash != item['hash']
+                or mi.stripe_price_cents != item['unit_amount']):
+            out.append(item)
+    return out
+
+
+def _push(item):
+    """Create/update one item's Product and Price in Stripe. Runs without the DB."""
+    product_id = item['stripe_product_id']
+    if product_id is None:
+        product_id = stripe.Product.create(
+            idempotency_key=f"menu-item-{item['id']}-product", **item['fields']).id
+    else:
+        stripe.Product.modify(product_id, **item['fields'])
+    price_id = item['stripe_price_id']
+    if price_id is None or item['stripe_price_cents'] != item['unit_amount']:
+        price_id = stripe.Price.create(
+            product=product_id,
+            unit_amount=item['unit_amount'],
+            currency=CURRENCY,
+            metadata={'menu_item_id': str(item['id'])},
+            idempotency_key=f"menu-item-{item['id']}-{product_id}-price-{item['unit_amount']}",
+        ).id
+    return {
+        'id': item['id'],
+        'stripe_product_id': product_id,
+        'stripe_price_id': price_id,
+        'stripe_price_cents': item['unit_amount'],
+        'stripe_sync_hash': item['hash'],
+    }
+
+
+def sync_catalog(full=False, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+    """Push changed items to Stripe; returns {'checked', 'synced', 'failed'}.
+
+    Raises SyncError after saving the successful items if any item failed.
+    """
+    items = pending_items(full)
+    db.session.commit()  # don't hold a read transaction open during Stripe calls
+    synced, failed = 0, []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            futures = [(item, pool.submit(_push, item)) for item in batch]
+            rows = []
+            for item, future in futures:
+                try:
+                    rows.append(future.result())
+                except stripe.error.StripeError as e:
+                    failed.append((item['id'], str(e)))
+            if rows:
+                db.session.bulk_update_mappings(MenuItem, rows)
+                db.session.commit()
+                synced += len(rows)
+    if synced:
+        # snapshots carry the price ids used at checkout
+        catalog.invalidate()
+    result = {'checked': len(items), 'synced': synced, 'failed': len(failed)}
+    if failed:
+        raise SyncError(f"{len(failed)} item(s) failed, first: menu item {failed[0][0]}: {failed[0][1]}")
+    return result
+
+
+def enqueue_sync():
+    """Queue a sync in the caller's transaction unless one is already waiting."""
+    if not stripe.api_key:
+        return None
+    if Job.query.filter_by(kind=JOB_KIND, status='queued').first() is not None:
+        return None
+    return jobs.enqueue(JOB_KIND, {}, delay=DELAY)
+
+
+def enqueue_archive(product_id):
+    """Queue deactivation of a deleted item's Stripe product."""
+    if product_id and stripe.api_key:
+        jobs.enqueue(ARCHIVE_JOB_KIND, {'product_id': product_id})
+
+
+@jobs.handler(JOB_KIND)
+def _sync_job(payload):
+    result = sync_catalog(full=payload.get('full', False))
+    print(f"[INFO] Stripe catalog sync: {result}")
+
+
+@jobs.handler(ARCHIVE_JOB_KIND)
+def _archive_job(payload):
+    try:
+        stripe.Product.modify(payload['product_id'], active=False)
+    except stripe.error.InvalidRequestError as e:
+        raise jobs.PermanentError(str(e))
@@ -0,0 +1,131 @@
+"""Stripe webhook inbox.
+
+The webhook endpoint only verifies the signature and stores the raw event in
+`stripe_events`, keyed by Stripe's event id, then acknowledges. Redeliveries
+hit the primary key and are acknowledged without doing anything. Workers
+(scripts/run_worker.py) drain the inbox in batches and apply the order status
+changes in bulk (order_status.py), so webhook latency stays flat however many
+payments land at once.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from . import db, dbtasks, jobs, order_status
+from .models import StripeEvent
+
+BATCH_SIZE = int(os.getenv('STRIPE_EVENTS_BATCH', '100'))
+MAX_ATTEMPTS = 5
+# a batch claimed by a worker that died is retried after this long
+LOCK_TIMEOUT = timedelta(seconds=60)
+# processed events are kept this long so redeliveries are still recognised
+# (Stripe retries for up to three days)
+RETENTION = timedelta(days=int(os.getenv('STRIPE_EVENTS_RETENTION_DAYS', '30')))
+PURGE_INTERVAL = 3600
+
+
+def receive(event_id, event_type, payload, created=None):
+    """Store one verified event. Returns False if it was already received."""
+    db.session.add(StripeEvent(id=event_id, type=event_type, payload=payload, created=created,
+                               status='pending', attempts=0))
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _session_status(event_type, session):
+    """Order status a checkout.session event moves the order to, or None."""
+    if event_type == 'checkout.session.completed':
+        return 'completed' if session.get('payment_status') == 'paid' else 'pending'
+    if event_type == 'checkout.session.async_payment_failed':
+        return 'failed'
+    return None
+
+
+def transitions(events):
+    """[(order_id, status)] for a batch of events, in event order."""
+    out = []
+    for ev in sorted(events, key=lambda e: (e.created or 0, e.received_at or datetime.min)):
+        data = json.loads(ev.payload)
+        session = (data.get('data') or {}).get('object') or {}
+        status = _session_status(ev.type, session)
+        order_id = (session.get('metadata') or {}).get('order_id')
+        if status is None:
+            continue
+        if not order_id:
+            print(f"[WARNING] No order_id in session metadata ({ev.id})")
+            continue
+        try:
+            out.append((int(order_id), status))
+        except ValueError:
+            print(f"[WARNING] Bad order_id {order_id!r} in {ev.id}")
+    return out
+
+
+def claim(limit=BATCH_SIZE):
+    """Mark up to `limit` pending events as processing and return them."""
+    now = datetime.utcnow()
+    ready = or_(StripeEvent.status == 'pending',
+                and_(StripeEvent.status == 'processing', StripeEvent.locked_until < now))
+    claimed = dbtasks.claim(StripeEvent, ready, StripeEvent.received_at, limit, lambda attempts: {
+        'status': 'processing', 'attempts': attempts + 1, 'locked_until': now + LOCK_TIMEOUT})
+    if not claimed:
+        return []
+    return StripeEvent.query.filter(StripeEvent.id.in_(claimed)).all()
+
+
+def _mark(ids, values):
+    StripeEvent.query.filter(StripeEvent.id.in_(ids)).update(values, synchronize_session=False)
+
+
+def _process(events):
+    """Apply a set of events and mark them processed, all in one commit."""
+    applied = order_status.apply(transitions(events), commit=False)
+    _mark([e.id for e in events], {'status': 'processed', 'processed_at': datetime.utcnow(),
+                                   'locked_until': None, 'last_error': None})
+    db.session.commit()
+    return applied
+
+
+def drain(limit=BATCH_SIZE):
+    """Process one batch from the inbox; returns the number of events handled."""
+    _maybe_purge()
+    events = claim(limit)
+    if not events:
+        return 0
+    try:
+        _process(events)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[WARNING] webhook batch failed, retrying events one by one: {e}")
+        for ev in events:
+            try:
+                _process([ev])
+            except Exception as e:
+                db.session.rollback()
+                failed = ev.attempts >= MAX_ATTEMPTS
+                _mark([ev.id], {'status': 'failed' if failed else 'pending', 'locked_until': None,
+                                'last_error': f'{type(e).__name__}: {e}'})
+                db.session.commit()
+    return len(events)
+
+
+def purge_processed():
+    """Delete processed events past the retention window; returns rows removed."""
+    cutoff = datetime.utcnow() - RETENTION
+    n = (StripeEvent.query.filter(StripeEvent.status == 'processed', StripeEvent.processed_at < cutoff)
+         .delete(synchronize_session=False))
+    db.session.commit()
+    return n
+
+
+_maybe_purge = dbtasks.throttled(PURGE_INTERVAL, 'stripe_events purge')(purge_processed)
+
+
+jobs.poller(drain)
@@ -0,0 +1,28 @@
+"""catalog version sequence
+
+Revision ID: a6c3e9d1f742
+Revises: f2a7c4d9e318
+Create Date: 2026-10-18 23:12:40.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e9d1f742'
+down_revision = 'f2a7c4d9e318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # global catalog version for the postgres catalog bus (catalog_bus.py);
+    # other databases use the file or local bus and need nothing
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.CreateSequence(sa.Sequence('catalog_version_seq')))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.DropSequence(sa.Sequence('catalog_version_seq')))
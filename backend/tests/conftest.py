@@ -0,0 +1,17 @@
+import pytest
+
+from backend.app import create_app, db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('CATALOG_BUS', 'local')
+    monkeypatch.setenv('ENFORCE_QUERY_BUDGETS', '1')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
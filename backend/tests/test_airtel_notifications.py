@@ -0,0 +1,102 @@
+"""Airtel payment callbacks: verification, buffering and order updates."""
+import json
+
+import pytest
+
+from backend.app import airtel_notifications, db
+from backend.app.models import AirtelNotification, Order
+
+SECRET = 'test-secret'
+
+
+@pytest.fixture
+def partners(monkeypatch):
+    monkeypatch.setattr(airtel_notifications, 'CALLBACK_PARTNERS', {'SIGNED': SECRET, 'LISTED': None})
+    monkeypatch.setattr(airtel_notifications, 'ALLOW_UNSIGNED', False)
+
+
+def add_order(app, status='pending'):
+    with app.app_context():
+        order = Order(customer_name='Airtel test', total_cents=100, status=status)
+        db.session.add(order)
+        db.session.commit()
+        return order.id
+
+
+def callback(order_id, status_code='TS'):
+    txn_id = airtel_notifications.transaction_id(order_id)
+    return json.dumps({'transaction': {'id': txn_id, 'status_code': status_code, 'airtel_money_id': 'MP1'}})
+
+
+def post(client, partner, body, signature=None):
+    headers = {'X-Callback-Signature': signature} if signature else {}
+    return client.post(f'/api/airtel/notify/{partner}', data=body, content_type='application/json', headers=headers)
+
+
+def order_status(app, order_id):
+    with app.app_context():
+        return db.session.get(Order, order_id).status
+
+
+def test_signed_callback_completes_order(app, partners):
+    order_id = add_order(app)
+    body = callback(order_id)
+    assert post(app.test_client(), 'SIGNED', body, airtel_notifications.sign(SECRET, body)).status_code == 200
+    airtel_notifications.flush()
+    assert order_status(app, order_id) == 'completed'
+
+
+def test_unknown_partner_is_refused(app, partners):
+    order_id = add_order(app)
+    assert post(app.test_client(), 'anything', callback(order_id)).status_code == 403
+    airtel_notifications.flush()
+    assert order_status(app, order_id) == 'pending'
+
+
+@pytest.mark.parametrize('partner, signature', [('SIGNED', None), ('SIGNED', 'forged'), ('LISTED', None)])
+def test_unverified_callback_is_stored_without_touching_order(app, partners, partner, signature):
+    order_id = add_order(app)
+    assert post(app.test_client(), partner, callback(order_id), signature).status_code == 200
+    airtel_notifications.flush()
+    assert order_status(app, order_id) == 'pending'
+    with app.app_context():
+        row = db.session.get(AirtelNotification, airtel_notifications.transaction_id(order_id))
+        assert row is not None and not row.verified
+
+
+def test_unverified_redelivery_does_not_replace_verified_row(app, partners):
+    order_id = add_order(app)
+    client = app.test_client()
+    body = callback(order_id)
+    post(client, 'SIGNED', body, airtel_notifications.sign(SECRET, body))
+    airtel_notifications.flush()
+    post(client, 'LISTED', callback(order_id, 'TF'))
+    airtel_notifications.flush()
+    with app.app_context():
+        row = db.session.get(AirtelNotification, airtel_notifications.transaction_id(order_id))
+        assert (row.verified, row.status_code) == (True, 'TS')
+    assert order_status(app, order_id) == 'completed'
+
+
+def test_bad_callback_does_not_block_the_buffer(app, partners, monkeypatch):
+    good, bad = add_order(app), add_order(app)
+    poisoned = airtel_notifications.transaction_id(bad)
+    real_write = airtel_notifications.write
+
+    def write(rows):
+        # stands in for a row the database rejects (not an outage)
+        if any(r['transaction_id'] == poisoned for r in rows):
+            raise ValueError('rejected row')
+        return real_write(rows)
+
+    monkeypatch.setattr(airtel_notifications, 'write', write)
+    client = app.test_client()
+    for order_id in (bad, good):
+        body = callback(order_id)
+        assert post(client, 'SIGNED', body, airtel_notifications.sign(SECRET, body)).status_code == 200
+    airtel_notifications.flush()
+
+    stats = airtel_notifications.stats()
+    assert (stats['pending'], stats['dropped'], stats['written']) == (0, 1, 1)
+    assert order_status(app, good) == 'completed'
+    assert order_status(app, bad) == 'pending'
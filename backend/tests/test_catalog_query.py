@@ -0,0 +1,48 @@
+"""Keyset pagination of GET /api/menu/query."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import catalog, db
+from backend.app.models import Category, MenuItem
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        category = Category(name='Mains')
+        db.session.add(category)
+        db.session.flush()
+        base = datetime(2026, 1, 1)
+        for i in range(12):
+            db.session.add(MenuItem(name=f'Item {i}', price_cents=100 + i % 4, category_id=category.id,
+                                    created_at=base + timedelta(days=i % 5)))
+        db.session.commit()
+        # items added before created_at had a default
+        MenuItem.query.filter(MenuItem.id % 3 == 0).update({'created_at': None}, synchronize_session=False)
+        db.session.commit()
+        catalog.invalidate()
+    return app.test_client()
+
+
+def walk(client, sort, limit):
+    ids, cursor = [], None
+    while True:
+        url = f'/api/menu/query?sort={sort}&limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).json
+        ids += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize('sort', ['id', 'price', 'price_desc', 'name', 'newest'])
+@pytest.mark.parametrize('limit', [1, 2, 5])
+def test_pages_cover_every_item_once(client, sort, limit):
+    assert walk(client, sort, limit) == walk(client, sort, 100)
+    assert sorted(walk(client, sort, limit)) == list(range(1, 13))
+
+
+def test_newest_lists_undated_items_last(client):
+    ids = walk(client, 'newest', 2)
+    assert ids[-4:] == [12, 9, 6, 3]
@@ -0,0 +1,29 @@
+"""Polling for a queued Stripe checkout session needs the order's token."""
+import pytest
+
+from backend.app import catalog, db
+from backend.app.models import Category, MenuItem
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setattr('stripe.api_key', 'sk_test_queued')
+    monkeypatch.setattr('backend.app.api.STRIPE_CHECKOUT_ASYNC', True)
+    with app.app_context():
+        category = Category(name='Coffee')
+        category.items = [MenuItem(name='Latte', price_cents=450)]
+        db.session.add(category)
+        db.session.commit()
+        catalog.invalidate()
+    return app.test_client()
+
+
+def test_status_url_requires_the_order_token(client):
+    r = client.post('/api/stripe-checkout', json={'items': [{'menu_item_id': 1, 'qty': 1}], 'customer_name': 'Ada'})
+    assert r.status_code == 202
+    status_url = r.json['statusUrl']
+    order_id = r.json['orderId']
+
+    assert client.get(status_url).json['status'] == 'pending'
+    assert client.get(f'/api/orders/{order_id}/checkout-session').status_code == 404
+    assert client.get(f'/api/orders/{order_id}/checkout-session?token=guess').status_code == 404
@@ -0,0 +1,97 @@
+"""Idempotency-Key handling on the order-creating endpoints."""
+import threading
+import time
+import uuid
+
+import pytest
+
+from backend.app import api, catalog, db, idempotency, pricing
+from backend.app.models import Category, IdempotencyKey, MenuItem, Order
+
+CART = {'items': [{'menu_item_id': 1, 'qty': 2}], 'customer_name': 'Ada'}
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        category = Category(name='Coffee')
+        category.items = [MenuItem(name='Latte', price_cents=450)]
+        db.session.add(category)
+        db.session.commit()
+        catalog.invalidate()
+    return app.test_client()
+
+
+def checkout(client, key, body=CART):
+    return client.post('/api/cart/checkout', json=body, headers={'Idempotency-Key': key})
+
+
+def order_count(app):
+    with app.app_context():
+        return Order.query.count()
+
+
+def test_retry_replays_first_response(app, client):
+    key = str(uuid.uuid4())
+    first, retry = checkout(client, key), checkout(client, key)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json == first.json
+    assert retry.headers.get('Idempotent-Replayed') == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert order_count(app) == 1
+
+
+def test_key_reused_with_different_request_is_rejected(app, client):
+    key = str(uuid.uuid4())
+    assert checkout(client, key).status_code == 200
+    assert checkout(client, key, dict(CART, customer_name='Bob')).status_code == 422
+    assert order_count(app) == 1
+
+
+def test_server_error_releases_key(app, client, monkeypatch):
+    monkeypatch.setattr('stripe.api_key', None)
+    key = str(uuid.uuid4())
+    headers = {'Idempotency-Key': key}
+    first = client.post('/api/stripe-checkout', json=CART, headers=headers)
+    retry = client.post('/api/stripe-checkout', json=CART, headers=headers)
+    assert first.status_code == retry.status_code == 500
+    assert 'Idempotent-Replayed' not in retry.headers
+    with app.app_context():
+        assert IdempotencyKey.query.filter_by(key=key).count() == 0
+
+
+class _NoSharedInflight(dict):
+    """Hide in-process waiters, so duplicates meet in the database as across workers."""
+
+    def get(self, key, default=None):
+        return default
+
+
+@pytest.mark.parametrize('same_worker', [True, False])
+def test_concurrent_duplicates_create_one_order(app, client, monkeypatch, same_worker):
+    if not same_worker:
+        monkeypatch.setattr(idempotency, '_inflight', _NoSharedInflight())
+    real_price_cart = pricing.price_cart
+
+    def slow_price_cart(items):
+        # keep the first request running while the duplicate arrives
+        time.sleep(0.3)
+        return real_price_cart(items)
+
+    monkeypatch.setattr(api.pricing, 'price_cart', slow_price_cart)
+    key = str(uuid.uuid4())
+    responses = []
+
+    def send():
+        responses.append(checkout(app.test_client(), key))
+
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert sorted(r.headers.get('Idempotent-Replayed', 'false') for r in responses) == ['false', 'true']
+    assert responses[0].json == responses[1].json
+    assert order_count(app) == 1
@@ -0,0 +1,61 @@
+"""order_status.apply() must end where applying the events one by one would."""
+import random
+
+import pytest
+
+from backend.app import db, order_status
+from backend.app.models import Order
+
+STATUSES = ['pending', 'completed', 'failed', 'cancelled', None]
+
+
+def add_orders(app, statuses):
+    with app.app_context():
+        orders = [Order(customer_name='status test', total_cents=100, status=s) for s in statuses]
+        db.session.add_all(orders)
+        db.session.commit()
+        for order in orders:
+            if order.status is None:
+                # the column default fills in NULL on insert
+                Order.query.filter_by(id=order.id).update({'status': None})
+        db.session.commit()
+        return [order.id for order in orders]
+
+
+def statuses(app, ids):
+    with app.app_context():
+        rows = dict(db.session.query(Order.id, Order.status).filter(Order.id.in_(ids)))
+        return [rows[i] for i in ids]
+
+
+def test_late_pending_does_not_undo_completion(app):
+    one_by_one, batched = add_orders(app, ['pending', 'pending'])
+    with app.app_context():
+        for status in ('completed', 'pending'):
+            order_status.apply([(one_by_one, status)])
+        order_status.apply([(batched, 'completed'), (batched, 'pending')])
+    assert statuses(app, [one_by_one, batched]) == ['completed', 'completed']
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_matches_sequential(app, seed):
+    rng = random.Random(seed)
+    start = [rng.choice(STATUSES) for _ in range(60)]
+    sequential_ids, batched_ids = add_orders(app, start), add_orders(app, start)
+    events = [(i, rng.choice(['pending', 'completed', 'failed', 'refunded']))
+              for i in range(len(start)) for _ in range(rng.randint(0, 4))]
+    rng.shuffle(events)
+    with app.app_context():
+        for i, status in events:
+            order_status.apply([(sequential_ids[i], status)])
+        order_status.apply([(batched_ids[i], status) for i, status in events])
+    assert statuses(app, batched_ids) == statuses(app, sequential_ids)
+
+
+def test_counts_rows_changed_per_status(app):
+    ids = add_orders(app, ['pending', 'pending', 'completed'])
+    with app.app_context():
+        applied = order_status.apply([(ids[0], 'failed'), (ids[0], 'completed'), (ids[1], 'failed'),
+                                      (ids[2], 'failed')])
+    assert applied == {'completed': 1, 'failed': 1}
+    assert statuses(app, ids) == ['completed', 'failed', 'completed']
@@ -0,0 +1,56 @@
+"""Listing endpoints must run a constant number of queries as data grows.
+
+Each endpoint is requested over N and then 10N rows with
+ENFORCE_QUERY_BUDGETS on, so going over its @query_budget fails the request,
+and the two query counts must match (no per-row queries).
+
+Run from the repository root:
+  python -m pytest backend/tests
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import catalog, db
+from backend.app.api import ADMIN_SECRET
+from backend.app.models import Category, Customer, MenuItem, Order, OrderItem, Reservation
+from backend.app.querycount import count_queries
+
+N = 5
+
+ENDPOINTS = ['/api/menu', '/api/', '/api/admin/orders', '/api/admin/reservations']
+
+
+def seed(app, n):
+    """Add n categories (3 items each), n orders (2 items each) and n reservations."""
+    with app.app_context():
+        start = db.session.query(db.func.count(Category.id)).scalar()
+        for i in range(start, start + n):
+            cat = Category(name=f'Category {i}', position=i)
+            cat.items = [MenuItem(name=f'Item {i}.{j}', description='seeded', price_cents=100 + j) for j in range(3)]
+            db.session.add(cat)
+            order = Order(customer_name=f'Customer {i}', total_cents=300, status='pending')
+            order.items = [OrderItem(menu_item_id=None, qty=1, unit_price_cents=150) for _ in range(2)]
+            db.session.add(order)
+            customer = Customer(name=f'Customer {i}', email=f'customer{i}@example.com')
+            db.session.add(Reservation(customer=customer, table_number=i % 10 + 1, guests=2,
+                                       time_slot=datetime(2026, 1, 1) + timedelta(hours=i)))
+        db.session.commit()
+        catalog.invalidate()
+
+
+def query_count(app, client, path):
+    with app.app_context():
+        with count_queries(db.engine) as counter:
+            response = client.get(path, headers={'X-Admin-Secret': ADMIN_SECRET})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return counter['count']
+
+
+@pytest.mark.parametrize('path', ENDPOINTS)
+def test_listing_queries_do_not_grow_with_rows(app, path):
+    client = app.test_client()
+    seed(app, N)
+    small = query_count(app, client, path)
+    seed(app, 9 * N)
+    assert query_count(app, client, path) == small
@@ -0,0 +1,78 @@
+"""Stripe webhook inbox: dedupe on receipt, batch processing and retries."""
+import json
+
+import pytest
+
+from backend.app import db, webhooks
+from backend.app.models import Order, StripeEvent
+
+
+@pytest.fixture
+def client(app):
+    app.config['STRIPE_WEBHOOK_ALLOW_UNSIGNED'] = True
+    return app.test_client()
+
+
+def add_order(app):
+    with app.app_context():
+        order = Order(customer_name='Webhook test', total_cents=100, status='pending')
+        db.session.add(order)
+        db.session.commit()
+        return order.id
+
+
+def event(event_id, order_id, payment_status='paid', created=1000):
+    return json.dumps({
+        'id': event_id, 'type': 'checkout.session.completed', 'created': created,
+        'data': {'object': {'payment_status': payment_status, 'metadata': {'order_id': str(order_id)}}},
+    })
+
+
+def order_status(app, order_id):
+    with app.app_context():
+        return db.session.get(Order, order_id).status
+
+
+def test_duplicate_event_is_stored_and_applied_once(app, client):
+    order_id = add_order(app)
+    first = client.post('/api/webhook', data=event('evt_dup', order_id))
+    second = client.post('/api/webhook', data=event('evt_dup', order_id))
+    assert (first.status_code, first.json['duplicate']) == (200, False)
+    assert (second.status_code, second.json['duplicate']) == (200, True)
+    with app.app_context():
+        assert StripeEvent.query.count() == 1
+        assert webhooks.drain() == 1
+        assert webhooks.drain() == 0
+    assert order_status(app, order_id) == 'completed'
+
+
+def test_bad_event_is_retried_without_holding_back_the_batch(app, client):
+    order_id = add_order(app)
+    client.post('/api/webhook', data=event('evt_good', order_id))
+    with app.app_context():
+        # stored, but its payload no longer parses when the worker reads it
+        db.session.add(StripeEvent(id='evt_bad', type='checkout.session.completed', payload='{',
+                                   status='pending', attempts=0))
+        db.session.commit()
+        assert webhooks.drain() == 2
+        bad = db.session.get(StripeEvent, 'evt_bad')
+        assert (bad.status, bad.attempts) == ('pending', 1)
+        assert bad.last_error
+        assert db.session.get(StripeEvent, 'evt_good').status == 'processed'
+
+        for _ in range(webhooks.MAX_ATTEMPTS - 1):
+            webhooks.drain()
+        db.session.expire_all()
+        assert db.session.get(StripeEvent, 'evt_bad').status == 'failed'
+        assert webhooks.drain() == 0
+    assert order_status(app, order_id) == 'completed'
+
+
+def test_late_unpaid_completion_does_not_downgrade_order(app, client):
+    order_id = add_order(app)
+    # the paid completion and a later, stale unpaid one land in the same batch
+    client.post('/api/webhook', data=event('evt_paid', order_id, 'paid', created=1000))
+    client.post('/api/webhook', data=event('evt_unpaid', order_id, 'unpaid', created=1001))
+    with app.app_context():
+        assert webhooks.drain() == 2
+    assert order_status(app, order_id) == 'completed'
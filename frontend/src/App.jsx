@@ -78,14 +78,41 @@ function App() {
   const [searchQuery, setSearchQuery] = useState('')
 
   useEffect(() => {
-    fetch('/api/menu')
-      .then((r) => r.json())
-      .then((data) => {
-        // new /api/menu returns { categories: [...], promotions: [...] }
-        const cats = Array.isArray(data) ? data : (data.categories || [])
-        setCategories(cats)
-      })
-      .catch((err) => console.error('Failed to load menu:', err))
+    const fetchMenu = () =>
+      fetch('/api/menu')
+        .then((r) => r.json())
+        .then((data) => {
+          // new /api/menu returns { categories: [...], promotions: [...] }
+          const cats = Array.isArray(data) ? data : (data.categories || [])
+          setCategories(cats)
+        })
+        .catch((err) => console.error('Failed to load menu:', err))
+
+    fetchMenu()
+
+    // the server pushes catalog changes (availability, prices, promotions);
+    // reload the menu only when something actually changed
+    let source
+    let retryTimer
+    const connect = () => {
+      source = new EventSource('/api/menu/stream')
+      source.addEventListener('catalog', () => fetchMenu())
+      // EventSource reconnects dropped streams itself but gives up on an error
+      // status (503 when the server has no stream slot free): reopen it later
+      // and reload, since changes made meanwhile were not pushed
+      source.onerror = () => {
+        if (source.readyState !== EventSource.CLOSED) return
+        retryTimer = setTimeout(() => {
+          fetchMenu()
+          connect()
+        }, 3000 + Math.random() * 3000)
+      }
+    }
+    connect()
+    return () => {
+      clearTimeout(retryTimer)
+      source.close()
+    }
   }, [])
 
   return (
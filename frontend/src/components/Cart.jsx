@@ -1,8 +1,22 @@
 import React, { useState } from 'react'
 import { useCart } from '../context/CartContext'
 
+// The backend creates the Stripe session in a background job; poll until it is ready.
+async function waitForCheckoutUrl(statusUrl, { interval = 500, timeout = 30000 } = {}) {
+  const deadline = Date.now() + timeout
+  while (Date.now() < deadline) {
+    const res = await fetch(statusUrl, { cache: 'no-store' })
+    const data = await res.json()
+    if (!res.ok) throw new Error(data.error || 'Checkout failed')
+    if (data.status === 'ready') return data.url
+    if (data.status === 'failed') throw new Error('Payment session could not be created')
+    await new Promise((resolve) => setTimeout(resolve, interval))
+  }
+  throw new Error('Timed out waiting for the payment page')
+}
+
 export default function Cart() {
-  const { items, clearCart, addToCart } = useCart()
+  const { items, quote, clearCart, addToCart } = useCart()
   const [loading, setLoading] = useState(false)
   const [orderId, setOrderId] = useState(null)
   const [customer, setCustomer] = useState({ customer_name: '', customer_email: '', customer_phone: '' })
@@ -18,6 +32,11 @@ export default function Cart() {
   
   const savings = originalTotalCents - totalCents
 
+  // prefer the server quote (authoritative prices) once it arrives
+  const quotedTotalCents = quote ? quote.total_cents : totalCents
+  const quotedSavings = quote ? quote.discount_cents : savings
+  const flagged = new Set([...(quote?.missing || []), ...(quote?.unavailable || [])])
+
   async function handleCheckout(e) {
     e.preventDefault()
     setError(null)
@@ -42,8 +61,9 @@ export default function Cart() {
         setError(data.error || 'Checkout failed')
       } else {
         // Redirect to Stripe checkout
-        if (data.url) {
-          window.location.href = data.url
+        const url = data.url || (data.statusUrl && await waitForCheckoutUrl(data.statusUrl))
+        if (url) {
+          window.location.href = url
         } else {
           setError('Failed to get checkout URL')
         }
@@ -90,6 +110,7 @@ export default function Cart() {
                   <div>
                     <strong>{it.name}</strong> x {it.qty}
                     {hasDiscount && <span style={{ marginLeft: 8, color: '#ff6b6b', fontWeight: 600, fontSize: 12 }}>🎉 {it.discount_percent}% OFF</span>}
+                    {flagged.has(it.id) && <span style={{ marginLeft: 8, color: 'red', fontSize: 12 }}>No longer available</span>}
                   </div>
                   <div style={{ textAlign: 'right' }}>
                     {hasDiscount && originalPrice && (
@@ -107,10 +128,10 @@ export default function Cart() {
 
         <p>
           <strong>Total: </strong>
-          {(totalCents / 100).toFixed(2)}
-          {savings > 0 && (
+          {(quotedTotalCents / 100).toFixed(2)}
+          {quotedSavings > 0 && (
             <span style={{ marginLeft: 12, color: '#ff6b6b', fontWeight: 600 }}>
-              💰 You saved: ${(savings / 100).toFixed(2)}
+              💰 You saved: ${(quotedSavings / 100).toFixed(2)}
             </span>
           )}
         </p>
@@ -10,21 +10,10 @@ export default function ItemDetail() {
 
   useEffect(() => {
     setLoading(true)
-    fetch('/api/menu')
-      .then((r) => r.json())
-      .then((data) => {
-        // /api/menu may return an array or an object { categories: [...], promotions: [...] }
-        const cats = Array.isArray(data) ? data : (data.categories || [])
-        let found = null
-        for (const c of cats) {
-          const f = (c.items || []).find((it) => String(it.id) === String(id))
-          if (f) {
-            found = f
-            break
-          }
-        }
-        setItem(found)
-      })
+    // fetch just this item instead of scanning the whole /api/menu document
+    fetch(`/api/menu/items/${encodeURIComponent(id)}`)
+      .then((r) => (r.ok ? r.json() : null))
+      .then((data) => setItem(data))
       .catch((e) => console.error(e))
       .finally(() => setLoading(false))
   }, [id])
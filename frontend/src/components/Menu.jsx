@@ -1,52 +1,17 @@
-import React, { useState, useEffect } from 'react'
+import React from 'react'
 import { Link } from 'react-router-dom'
 import ItemCard from './ItemCard'
 import { useCart } from '../context/CartContext'
 
 export default function Menu({ categories = [], searchQuery = '', onSearchChange }) {
   const { addToCart } = useCart()
-  const [promos, setPromos] = useState([])
 
-  useEffect(() => {
-    let mounted = true
-
-    const fetchMenu = () => {
-      fetch('/api/menu')
-        .then((r) => r.json())
-        .then((data) => {
-          if (!mounted) return
-          // server returns { categories: [...], promotions: [...] }
-          const cats = Array.isArray(data) ? data : (data.categories || [])
-          const flat = (cats || []).flatMap((c) => (c.items || []).map((it) => ({ ...it, category: c.name })))
-          // server now includes discount_percent on each item if it has an active promotion
-          const promoItems = flat.filter((it) => it.discount_percent !== null && it.discount_percent !== undefined)
-          if (promoItems.length > 0) {
-            setPromos(promoItems.slice(0, 3))
-          } else {
-            setPromos([])
-          }
-        })
-        .catch(() => {})
-    }
-
-    fetchMenu()
-
-    // listen for admin updates (in same tab)
-    const onUpdate = () => fetchMenu()
-    window.addEventListener('promotions-updated', onUpdate)
-
-    // also listen for storage events (other tabs)
-    const onStorage = (e) => {
-      if (e.key === 'promotions_updated_at') fetchMenu()
-    }
-    window.addEventListener('storage', onStorage)
-
-    return () => {
-      mounted = false
-      window.removeEventListener('promotions-updated', onUpdate)
-      window.removeEventListener('storage', onStorage)
-    }
-  }, [])
+  // categories come from App, which keeps them live via the /api/menu/stream events;
+  // each item carries discount_percent when it has an active promotion
+  const promos = categories
+    .flatMap((c) => (c.items || []).map((it) => ({ ...it, category: c.name })))
+    .filter((it) => it.discount_percent !== null && it.discount_percent !== undefined)
+    .slice(0, 3)
 
   return (
     <div className="menu menu-grid">
@@ -12,10 +12,32 @@ export function CartProvider({ children }) {
     }
   })
 
+  // server-side price of the current cart (promotions applied, bad ids flagged)
+  const [quote, setQuote] = useState(null)
+
   useEffect(() => {
     localStorage.setItem('cart', JSON.stringify(items))
   }, [items])
 
+  useEffect(() => {
+    if (items.length === 0) {
+      setQuote(null)
+      return
+    }
+    // re-quote on every change; abort the previous request if still in flight
+    const controller = new AbortController()
+    fetch('/api/cart/quote', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ items: items.map((it) => ({ menu_item_id: it.id, qty: it.qty })) }),
+      signal: controller.signal,
+    })
+      .then((r) => (r.ok ? r.json() : null))
+      .then((data) => setQuote(data))
+      .catch(() => {})
+    return () => controller.abort()
+  }, [items])
+
   function addToCart(item, qty = 1) {
     setItems((prev) => {
       const found = prev.find((p) => p.id === item.id)
@@ -33,7 +55,7 @@ export function CartProvider({ children }) {
   }
 
   return (
-    <CartContext.Provider value={{ items, addToCart, clearCart }}>
+    <CartContext.Provider value={{ items, quote, addToCart, clearCart }}>
       {children}
     </CartContext.Provider>
   )
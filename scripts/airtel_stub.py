@@ -0,0 +1,274 @@
+"""
+scripts/airtel_stub.py
+
+A small local stand-in for the Airtel Money merchant API, for offline
+benchmarks and failure testing of backend/app/airtel_client.py.
+
+Implements, under /<prefix> (default merchant-collection/v1):
+  POST merchant          register merchants
+  GET  fetch             list registered merchants
+  POST payments          create a payment (transaction.id is the idempotency key)
+  POST payments/refund   refund by transaction.airtel_money_id
+  GET  payments/<id>     transaction status enquiry
+plus POST /auth/oauth2/token (client credentials), GET /_stub/stats,
+POST /_stub/reset, POST /_stub/revoke (invalidate every issued token) and
+POST /_stub/payments/<id>/<status code> (e.g. TF: the customer declined).
+
+Usage:
+  python scripts/airtel_stub.py --port 12112 --latency 80 --connect-latency 40
+  python scripts/airtel_stub.py --error-rate 0.2 --hang-rate 0.05   # flaky Airtel
+  python scripts/airtel_stub.py --require-auth --token-ttl 60       # bearer tokens enforced
+
+then run the backend with AIRTEL_BASE_URL=http://127.0.0.1:12112.
+
+--error-rate answers that fraction of calls with 503, --hang-rate sleeps past
+any sane read timeout before answering. With --require-auth, API calls
+without a live token from the token endpoint get 401.
+"""
+import argparse
+import functools
+import itertools
+import json
+import random
+import secrets
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PREFIX = 'merchant-collection/v1'
+
+
+def _status(ok=True, message='SUCCESS', code='200'):
+    return {'code': code, 'message': message, 'success': ok,
+            'result_code': 'ESB000010' if ok else 'ESB000001', 'response_code': 'DP00800001001' if ok else 'DP00800001000'}
+
+
+class StubState:
+    def __init__(self, latency=0.0, connect_latency=0.0, error_rate=0.0, hang_rate=0.0, hang_seconds=60.0,
+                 require_auth=False, token_ttl=180.0):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.require_auth = require_auth
+        self.token_ttl = token_ttl
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.ids = itertools.count(1)
+            self.merchants = []
+            self.transactions = {}   # transaction id -> transaction
+            self.by_money_id = {}    # airtel_money_id -> transaction id
+            self.tokens = {}         # access token -> expiry (time.time())
+            self.stats = {'connections': 0, 'requests': 0, 'errors': 0, 'hangs': 0,
+                          'tokens_issued': 0, 'unauthorized': 0, 'by_path': {}}
+
+
+def make_handler(state, prefix=PREFIX):
+    base = '/' + prefix.strip('/')
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive, so client pooling is measurable
+
+        def setup(self):
+            super().setup()
+            # headers and body go out as separate writes; don't let Nagle hold the body
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with state.lock:
+                state.stats['connections'] += 1
+            if state.connect_latency:
+                time.sleep(state.connect_latency)
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length))
+            except ValueError:
+                return None
+
+        def _handle(self, method):
+            body = self._body()
+            path = urlsplit(self.path).path
+            with state.lock:
+                state.stats['requests'] += 1
+                state.stats['by_path'][path] = state.stats['by_path'].get(path, 0) + 1
+
+            if path == '/_stub/stats':
+                return self._send(200, state.stats)
+            if path == '/_stub/reset':
+                state.reset()
+                return self._send(200, {'ok': True})
+            if path.startswith('/_stub/payments/'):
+                txn_id, _, code = path[len('/_stub/payments/'):].partition('/')
+                with state.lock:
+                    txn = state.transactions.get(txn_id)
+                    if txn is not None and code:
+                        txn['status'] = code
+                if txn is None:
+                    return self._send(404, {'status': _status(False, f'Transaction {txn_id} not found', '404')})
+                return self._send(200, {'data': {'transaction': txn}, 'status': _status()})
+            if path == '/_stub/revoke':
+                with state.lock:
+                    state.tokens.clear()
+                return self._send(200, {'ok': True})
+
+            if state.latency:
+                time.sleep(state.latency)
+            roll = random.random()
+            if roll < state.hang_rate:
+                with state.lock:
+                    state.stats['hangs'] += 1
+                time.sleep(state.hang_seconds)
+            elif roll < state.hang_rate + state.error_rate:
+                with state.lock:
+                    state.stats['errors'] += 1
+                return self._send(503, {'status': _status(False, 'Service Unavailable', '503')})
+            if body is None:
+                return self._send(400, {'status': _status(False, 'Invalid JSON', '400')})
+
+            if (method, path) == ('POST', '/auth/oauth2/token'):
+                return self._send(*self._token(body))
+            if state.require_auth and not self._authorized():
+                with state.lock:
+                    state.stats['unauthorized'] += 1
+                return self._send(401, {'status': _status(False, 'Invalid or expired token', '401')})
+
+            route = path[len(base):].strip('/') if path.startswith(base + '/') else None
+            handler = {
+                ('POST', 'merchant'): self._register,
+                ('GET', 'fetch'): self._fetch,
+                ('POST', 'payments'): self._payment,
+                ('POST', 'payments/refund'): self._refund,
+            }.get((method, route))
+            if handler is None and method == 'GET' and route and route.startswith('payments/'):
+                handler = functools.partial(self._enquiry, route[len('payments/'):])
+            if handler is None:
+                return self._send(404, {'status': _status(False, f'No route {method} {path}', '404')})
+            return self._send(*handler(body))
+
+        def _authorized(self):
+            auth = self.headers.get('Authorization') or ''
+            token = auth[len('Bearer '):] if auth.startswith('Bearer ') else None
+            with state.lock:
+                expires = state.tokens.get(token)
+            return expires is not None and expires > time.time()
+
+        def _token(self, body):
+            if body.get('grant_type') != 'client_credentials' or not body.get('client_id') \
+                    or not body.get('client_secret'):
+                return 400, {'error': 'invalid_request', 'error_description': 'client credentials required'}
+            token = secrets.token_urlsafe(24)
+            with state.lock:
+                state.tokens[token] = time.time() + state.token_ttl
+                state.stats['tokens_issued'] += 1
+            return 200, {'access_token': token, 'expires_in': str(int(state.token_ttl)), 'token_type': 'bearer'}
+
+        def _register(self, body):
+            merchants = body.get('merchants') or []
+            with state.lock:
+                state.merchants.extend(merchants)
+            return 200, {'data': {'merchants': merchants}, 'status': _status()}
+
+        def _fetch(self, body):
+            with state.lock:
+                merchants = list(state.merchants)
+            return 200, {'data': {'merchants': merchants}, 'status': _status()}
+
+        def _payment(self, body):
+            txn = body.get('transaction') or {}
+            txn_id = txn.get('id')
+            if not txn_id:
+                return 400, {'status': _status(False, 'transaction.id is required', '400')}
+            with state.lock:
+                existing = state.transactions.get(txn_id)
+                if existing is None:
+                    money_id = f'MP{next(state.ids):010d}'
+                    existing = {'id': txn_id, 'airtel_money_id': money_id, 'status': 'TS',
+                                'amount': txn.get('amount'), 'reference': body.get('reference')}
+                    state.transactions[txn_id] = existing
+                    state.by_money_id[money_id] = txn_id
+            return 200, {'data': {'transaction': existing}, 'status': _status()}
+
+        def _refund(self, body):
+            money_id = (body.get('transaction') or {}).get('airtel_money_id')
+            with state.lock:
+                txn_id = state.by_money_id.get(money_id)
+                txn = state.transactions.get(txn_id)
+                if txn is not None:
+                    txn['status'] = 'TR'
+            if txn is None:
+                return 404, {'status': _status(False, f'Transaction {money_id} not found', '404')}
+            return 200, {'data': {'transaction': {'airtel_money_id': money_id, 'status': 'TS'}}, 'status': _status()}
+
+        def _enquiry(self, txn_id, body):
+            with state.lock:
+                txn = dict(state.transactions.get(txn_id) or {})
+            if not txn:
+                return 404, {'status': _status(False, f'Transaction {txn_id} not found', '404')}
+            return 200, {'data': {'transaction': {'id': txn['id'], 'airtel_money_id': txn['airtel_money_id'],
+                                                  'status': txn['status'], 'message': 'stub'}},
+                         'status': _status()}
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+    return Handler
+
+
+def start(port=0, prefix=PREFIX, **options):
+    """Start the stub on a background thread; returns (server, base_url, state)."""
+    state = StubState(**options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state, prefix))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='airtel-stub', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}', state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=12112)
+    parser.add_argument('--prefix', default=PREFIX)
+    parser.add_argument('--latency', type=float, default=0, help='ms added to every request')
+    parser.add_argument('--connect-latency', type=float, default=0, help='ms added to every new connection')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of calls answered with 503')
+    parser.add_argument('--hang-rate', type=float, default=0, help='fraction of calls that hang')
+    parser.add_argument('--hang-seconds', type=float, default=60)
+    parser.add_argument('--require-auth', action='store_true', help='reject calls without a live token')
+    parser.add_argument('--token-ttl', type=float, default=180, help='seconds issued tokens live')
+    args = parser.parse_args()
+
+    server, url, _ = start(args.port, args.prefix, latency=args.latency / 1000,
+                           connect_latency=args.connect_latency / 1000, error_rate=args.error_rate,
+                           hang_rate=args.hang_rate, hang_seconds=args.hang_seconds,
+                           require_auth=args.require_auth, token_ttl=args.token_ttl)
+    print(f'Airtel stub listening on {url} (AIRTEL_BASE_URL={url})')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+scripts/bench_airtel.py
+
+Benchmark Airtel payment calls against the local stub (scripts/airtel_stub.py).
+
+1. throughput: bare requests.post per call (a new connection each time, as the
+   client used to do) vs the pooled AirtelClient;
+2. outage: every call answers 503; shows the circuit breaker failing fast
+   instead of each request waiting on Airtel;
+3. batch: refunds one after another (as a caller looping over the API would)
+   vs airtel_batch.batch() with bounded concurrency and a per-partner rate
+   limit.
+
+Usage:
+  python scripts/bench_airtel.py
+  python scripts/bench_airtel.py --calls 1000 --threads 16 --latency 80 --connect-latency 60
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+import requests
+
+import airtel_stub
+
+
+def run(label, call, calls, threads):
+    latencies, outcomes = [], {}
+    lock = threading.Lock()
+    counter = iter(range(calls))
+
+    def worker():
+        mine, seen = [], {}
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            t0 = time.perf_counter()
+            try:
+                outcome = str(call(i).status_code)
+            except Exception as e:
+                outcome = type(e).__name__
+            mine.append(time.perf_counter() - t0)
+            seen[outcome] = seen.get(outcome, 0) + 1
+        with lock:
+            latencies.extend(mine)
+            for k, v in seen.items():
+                outcomes[k] = outcomes.get(k, 0) + v
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{label:>22}: {calls / elapsed:8.1f} calls/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:7.1f} ms  {outcomes}")
+
+
+def payment(i):
+    return {'reference': f'bench {i}', 'subscriber': {'country': 'MW', 'currency': 'MWK', 'msisdn': '999000000'},
+            'transaction': {'amount': 1000, 'country': 'MW', 'currency': 'MWK', 'id': f'bench-{time.time_ns()}-{i}'}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=20, help='ms per request')
+    parser.add_argument('--connect-latency', type=float, default=30, help='ms per new connection')
+    parser.add_argument('--batch', type=int, default=200, help='refunds per batch')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--partner-rate', type=float, default=200, help='calls/s per partner')
+    args = parser.parse_args()
+
+    server, url, state = airtel_stub.start(latency=args.latency / 1000, connect_latency=args.connect_latency / 1000)
+    os.environ['AIRTEL_BASE_URL'] = url
+    from backend.app import airtel_client as airtel
+
+    print(f'{args.calls} payments, {args.threads} threads, stub {url}')
+    client = airtel.AirtelClient(session=airtel.build_session(args.threads))
+    headers = client._headers()
+
+    state.reset()
+    run('bare requests.post', lambda i: requests.post(client._url('payments'), json=payment(i),
+                                                       headers=headers, timeout=30), args.calls, args.threads)
+    print(f"{'':>22}  connections opened: {state.stats['connections']}")
+    state.reset()
+    run('pooled AirtelClient', lambda i: client.create_payment(payment(i)), args.calls, args.threads)
+    print(f"{'':>22}  connections opened: {state.stats['connections']}")
+
+    state.error_rate = 1.0
+    state.reset()
+    run('outage, no breaker', lambda i: requests.post(client._url('payments'), json=payment(i),
+                                                       headers=headers, timeout=30), args.calls, args.threads)
+    print(f"{'':>22}  requests reaching Airtel: {state.stats['requests']}")
+    state.reset()
+    run('outage, breaker', lambda i: client.create_payment(payment(i)), args.calls, args.threads)
+    print(f"{'':>22}  requests reaching Airtel: {state.stats['requests']}  breaker: {client.breaker.state}")
+
+    from backend.app import airtel_batch
+    state.error_rate = 0.0
+    client = airtel.AirtelClient(session=airtel.build_session(args.threads))
+    paid = [client.create_payment(payment(i)).json()['data']['transaction'] for i in range(args.batch)]
+    refunds = [{'partner': f'P{i % 2}', 'payload': {'transaction': {'airtel_money_id': t['airtel_money_id']}}}
+               for i, t in enumerate(paid)]
+    print(f'\n{args.batch} refunds across 2 partners, concurrency {args.concurrency}, '
+          f'{args.partner_rate:g} calls/s per partner')
+    start = time.perf_counter()
+    ok = sum(client.refund_payment(r['payload']).status_code == 200 for r in refunds)
+    elapsed = time.perf_counter() - start
+    print(f"{'sequential':>22}: {args.batch / elapsed:8.1f} calls/s  {elapsed * 1000:8.1f} ms total  ok {ok}")
+    batch_client = airtel.AsyncAirtelClient(client, concurrency=args.concurrency)
+    out = airtel_batch.batch(batch_client, 'refund', refunds, concurrency=args.concurrency, rate=args.partner_rate)
+    print(f"{'airtel_batch':>22}: {args.batch / out['elapsed_ms'] * 1000:8.1f} calls/s  "
+          f"{out['elapsed_ms']:8.1f} ms total  ok {out['succeeded']} failed {out['failed']}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+scripts/bench_airtel_auth.py
+
+Exercise Airtel token management against the local stub
+(scripts/airtel_stub.py --require-auth) with short-lived tokens.
+
+1. steady state: threads call create_payment for --seconds while tokens expire
+   every --token-ttl seconds; reports tokens fetched, 401s and the slowest
+   call (no call should wait on a token fetch after the first);
+2. revoke: every token is invalidated mid-run; each in-flight thread sees one
+   401, a single refresh replaces the token and the calls are retried;
+3. workers: --workers processes sharing the token through the file cache;
+   tokens issued stay at one per refresh however many workers run.
+
+Usage:
+  python scripts/bench_airtel_auth.py
+  python scripts/bench_airtel_auth.py --seconds 10 --token-ttl 3 --threads 16
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import airtel_stub
+from bench_airtel import payment
+
+
+def hammer(client, seconds, threads, revoke_at=None, revoke=None):
+    stop = time.monotonic() + seconds
+    lock = threading.Lock()
+    stats = {'calls': 0, 'slowest': 0.0, 'statuses': {}}
+
+    def worker():
+        i = 0
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            try:
+                outcome = str(client.create_payment(payment(i)).status_code)
+            except Exception as e:
+                outcome = type(e).__name__
+            took = time.perf_counter() - t0
+            i += 1
+            with lock:
+                stats['calls'] += 1
+                stats['slowest'] = max(stats['slowest'], took)
+                stats['statuses'][outcome] = stats['statuses'].get(outcome, 0) + 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    if revoke_at is not None:
+        time.sleep(revoke_at)
+        revoke()
+    for t in workers:
+        t.join()
+    return stats
+
+
+def _worker_process(url, cache_path, seconds, threads, out):
+    os.environ['AIRTEL_BASE_URL'] = url
+    from backend.app import airtel_auth, airtel_client as airtel
+    tokens = airtel_auth.TokenManager(f'{url}/{airtel_auth.TOKEN_PATH}', 'bench', 'secret',
+                                      cache=airtel_auth.FileCache(cache_path), refresh_margin=1)
+    client = airtel.AirtelClient(session=airtel.build_session(threads), tokens=tokens)
+    stats = hammer(client, seconds, threads)
+    tokens.close()
+    out.put((stats['calls'], stats['statuses'].get('401', 0), tokens.fetches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=6)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--token-ttl', type=float, default=2)
+    parser.add_argument('--latency', type=float, default=10, help='ms per request')
+    args = parser.parse_args()
+
+    server, url, state = airtel_stub.start(latency=args.latency / 1000, require_auth=True, token_ttl=args.token_ttl)
+    os.environ['AIRTEL_BASE_URL'] = url
+    from backend.app import airtel_auth, airtel_client as airtel
+
+    def manager(cache=None):
+        return airtel_auth.TokenManager(f'{url}/{airtel_auth.TOKEN_PATH}', 'bench', 'secret',
+                                        cache=cache, refresh_margin=1)
+
+    print(f'{args.threads} threads for {args.seconds:g}s, tokens live {args.token_ttl:g}s, stub {url}')
+    client = airtel.AirtelClient(session=airtel.build_session(args.threads), tokens=manager())
+    stats = hammer(client, args.seconds, args.threads)
+    client.tokens.close()
+    print(f"{'steady state':>14}: {stats['calls']} calls  {stats['statuses']}  "
+          f"tokens issued {state.stats['tokens_issued']}  slowest call {stats['slowest'] * 1000:.1f} ms")
+
+    state.reset()
+
+    def revoke():
+        with state.lock:
+            state.tokens.clear()
+
+    client = airtel.AirtelClient(session=airtel.build_session(args.threads), tokens=manager())
+    stats = hammer(client, args.seconds, args.threads, revoke_at=args.seconds / 2, revoke=revoke)
+    client.tokens.close()
+    print(f"{'revoked':>14}: {stats['calls']} calls  {stats['statuses']}  "
+          f"401s answered {state.stats['unauthorized']}  tokens issued {state.stats['tokens_issued']}")
+
+    state.reset()
+    cache_path = os.path.join(tempfile.mkdtemp(), 'airtel-token')
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_worker_process, args=(url, cache_path, args.seconds, args.threads, out))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    calls = sum(r[0] for r in results)
+    print(f"{'workers':>14}: {args.workers} processes, {calls} calls, 401s {sum(r[1] for r in results)}, "
+          f"tokens issued {state.stats['tokens_issued']} (fetches per worker {[r[2] for r in results]})")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+scripts/bench_airtel_notify.py
+
+Post Airtel payment callbacks at POST /api/airtel/notify/<partner> and
+compare writing each one to the database inside the request with the
+write-behind buffer (airtel_notifications.py).
+
+A tenth of the callbacks are redeliveries of an earlier transaction; after
+the run the script checks there is one row per transaction and that the
+linked orders moved to completed/failed.
+
+Usage:
+  python scripts/bench_airtel_notify.py                     # 5k callbacks, throwaway SQLite
+  python scripts/bench_airtel_notify.py --callbacks 20000 --threads 8 --database-url postgresql://...
+
+Orders are written to the target database; use a scratch database for Postgres.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+SECRET = 'bench-secret'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--callbacks', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ['DATABASE_URL'] = url
+    os.environ.setdefault('CATALOG_BUS', 'local')
+    os.environ['AIRTEL_CALLBACK_PARTNERS'] = f'BENCH:{SECRET}'
+
+    from backend.app import create_app, db, airtel_notifications
+    from backend.app.models import AirtelNotification, Order
+
+    app = create_app()
+    rng = random.Random(7)
+    n = args.callbacks
+
+    def seed(tag):
+        with app.app_context():
+            db.session.bulk_insert_mappings(Order, [
+                {'customer_name': f'{tag} {i}', 'total_cents': 100, 'status': 'pending'} for i in range(n)
+            ])
+            db.session.commit()
+            ids = [row[0] for row in db.session.query(Order.id).filter(Order.customer_name.like(f'{tag} %'))]
+        bodies = []
+        for order_id in ids:
+            txn = {'id': airtel_notifications.transaction_id(order_id, tag),
+                   'airtel_money_id': f'MP{order_id:010d}', 'message': 'bench',
+                   'status_code': rng.choice(('TS', 'TS', 'TS', 'TF'))}
+            bodies.append(json.dumps({'transaction': txn}))
+        # redeliveries
+        bodies[-(n // 10):] = rng.sample(bodies[:n - n // 10], n // 10)
+        return bodies
+
+    def post_all(bodies):
+        chunks = [bodies[i::args.threads] for i in range(args.threads)]
+        errors = []
+
+        def worker(chunk):
+            client = app.test_client()
+            for body in chunk:
+                r = client.post('/api/airtel/notify/BENCH', data=body, content_type='application/json',
+                                headers={'X-Callback-Signature': airtel_notifications.sign(SECRET, body)})
+                if r.status_code != 200:
+                    errors.append(r.status_code)
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return time.perf_counter() - start, errors
+
+    def check(tag):
+        with app.app_context():
+            rows = AirtelNotification.query.filter(AirtelNotification.transaction_id.like(f'%-{tag}')).count()
+            statuses = dict(db.session.query(Order.status, db.func.count(Order.id))
+                            .filter(Order.customer_name.like(f'{tag} %')).group_by(Order.status).all())
+        return rows, statuses
+
+    with app.app_context():
+        db.create_all()
+    print(f"{n} callbacks ({n // 10} redeliveries), {args.threads} threads, {url.split(':')[0]}")
+
+    # baseline: persist and apply inside the request
+    bodies = seed('sync')
+    buffer_receive = airtel_notifications.receive
+
+    def receive_sync(partner, data, raw, signature=None):
+        trust = airtel_notifications.verify(partner, raw, signature)
+        if trust == 'unknown':
+            return 'forbidden'
+        row = airtel_notifications.parse(partner, data, raw, verified=trust == 'verified')
+        if row is None:
+            return 'invalid'
+        try:
+            airtel_notifications.write([row])
+        except Exception:
+            db.session.rollback()
+            raise
+        return 'queued'
+
+    airtel_notifications.receive = receive_sync
+    secs, errors = post_all(bodies)
+    airtel_notifications.receive = buffer_receive
+    rows, statuses = check('sync')
+    print(f"{'write per request':>18}: {n / secs:8.0f} callbacks/s  errors {len(errors)}  rows {rows}  orders {statuses}")
+
+    bodies = seed('buffered')
+    secs, errors = post_all(bodies)
+    start = time.perf_counter()
+    airtel_notifications.flush()
+    drain = time.perf_counter() - start
+    rows, statuses = check('buffered')
+    print(f"{'write-behind':>18}: {n / secs:8.0f} callbacks/s  errors {len(errors)}  rows {rows}  orders {statuses}")
+    print(f"{'':>18}  final flush {drain * 1000:.0f} ms  {airtel_notifications.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+scripts/bench_reconcile.py
+
+Run payment reconciliation (backend/app/reconcile.py) against in-process
+Stripe and Airtel stubs and a throwaway database, once checking one order at
+a time and once with a bounded concurrent pool.
+
+Half the seeded orders have a Checkout session (paid, expired or still open),
+half an Airtel transaction (TS, TF, in progress or never created). Both runs
+must end with the same order statuses.
+
+Usage:
+  python scripts/bench_reconcile.py
+  python scripts/bench_reconcile.py --orders 5000 --concurrency 16 --latency 50
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import airtel_stub
+import stripe_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=20, help='ms per provider call')
+    args = parser.parse_args()
+
+    stripe_server, stripe_url, stripe_state = stripe_stub.start(latency=args.latency / 1000)
+    airtel_server, airtel_url, airtel_state = airtel_stub.start(latency=args.latency / 1000)
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault('CATALOG_BUS', 'local')
+    os.environ['STRIPE_SECRET_KEY'] = 'sk_test_stub'
+    os.environ['STRIPE_API_BASE'] = stripe_url
+    os.environ['AIRTEL_BASE_URL'] = airtel_url
+
+    from backend.app import create_app, db, reconcile
+    from backend.app.airtel_notifications import transaction_id
+    from backend.app.models import Order
+
+    app = create_app()
+    rng = random.Random(3)
+    n = args.orders
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(Order, [
+            {'customer_name': f'reconcile {i}', 'total_cents': 100, 'status': 'pending',
+             'created_at': datetime.utcnow() - timedelta(hours=1)} for i in range(n)
+        ])
+        db.session.commit()
+        ids = [row[0] for row in db.session.query(Order.id).filter(Order.customer_name.like('reconcile %'))]
+
+        sessions = []
+        for order_id in ids[:n // 2]:
+            session, _ = stripe_stub._object(stripe_state, 'cs', 'checkout.session',
+                                             {'metadata': {'order_id': str(order_id)}})
+            roll = rng.random()
+            if roll < 0.4:
+                session.update(status='complete', payment_status='paid')
+            elif roll < 0.6:
+                session.update(status='expired')
+            sessions.append({'id': order_id, 'stripe_session_id': session['id']})
+        db.session.bulk_update_mappings(Order, sessions)
+        db.session.commit()
+        for i, order_id in enumerate(ids[n // 2:]):
+            roll = rng.random()
+            if roll < 0.8:
+                txn_id = transaction_id(order_id)
+                airtel_state.transactions[txn_id] = {
+                    'id': txn_id, 'airtel_money_id': f'MP{i:010d}',
+                    'status': 'TS' if roll < 0.4 else 'TF' if roll < 0.6 else 'TIP'}
+
+        def reset_orders():
+            Order.query.filter(Order.id.in_(ids)).update({'status': 'pending'}, synchronize_session=False)
+            db.session.commit()
+
+        def outcome():
+            return dict(db.session.query(Order.status, db.func.count(Order.id))
+                        .filter(Order.id.in_(ids)).group_by(Order.status).all())
+
+        print(f'{n} pending orders, provider latency {args.latency:g} ms, pages of {args.batch}')
+        results = {}
+        for label, concurrency in (('one at a time', 1), (f'{args.concurrency} concurrent', args.concurrency)):
+            reset_orders()
+            m = reconcile.reconcile(batch_size=args.batch, concurrency=concurrency, min_age=timedelta(0))
+            results[label] = outcome()
+            print(f"{label:>15}: {m['scanned_per_second']:8.1f} orders/s  {m['elapsed']:6.2f}s  checked {m['checked']}  "
+                  f"updated {m['updated']}  errors {m['errors']}")
+        again = reconcile.reconcile(batch_size=args.batch, concurrency=args.concurrency, min_age=timedelta(0))
+        print(f"{'rerun':>15}: scanned {again['scanned']} still pending, updated {again['updated']}")
+        print(f"{'':>15}  final statuses {results[label]}  (runs agree: {len(set(map(str, results.values()))) == 1})")
+
+    stripe_server.shutdown()
+    airtel_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
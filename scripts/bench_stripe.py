@@ -0,0 +1,107 @@
+"""
+scripts/bench_stripe.py
+
+Measure Stripe checkout-session throughput against the local stub
+(scripts/stripe_stub.py), comparing a new connection per call with the
+shared keep-alive pool from backend/app/stripe_client.py.
+
+Usage:
+  python scripts/bench_stripe.py                            # in-process stub
+  python scripts/bench_stripe.py --latency 80 --connect-latency 60 --threads 8
+  python scripts/bench_stripe.py --stub-url http://127.0.0.1:12111
+
+--connect-latency stands in for the TCP + TLS handshake to api.stripe.com,
+which is the cost pooling removes.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+
+import requests
+import stripe
+
+import stripe_stub
+from backend.app import stripe_client
+
+
+class FreshConnectionClient(stripe.RequestsClient):
+    """Opens (and closes) a new connection for every request."""
+
+    def request(self, method, url, headers, post_data=None):
+        with requests.Session() as session:
+            self._thread_local.session = session
+            try:
+                return super().request(method, url, headers, post_data)
+            finally:
+                self._thread_local.session = None
+
+
+LINE_ITEMS = [
+    {'price_data': {'currency': 'usd', 'product_data': {'name': f'Item {i}', 'description': 'Bench item'},
+                    'unit_amount': 500 + i}, 'quantity': 1 + i % 3}
+    for i in range(3)
+]
+
+
+def _stats(url):
+    with urllib.request.urlopen(f'{url}/_stub/stats') as resp:
+        return json.load(resp)
+
+
+def run(label, http_client, url, calls, threads):
+    stripe_client.configure('sk_test_stub', url, max_network_retries=0, http_client=http_client)
+    urllib.request.urlopen(urllib.request.Request(f'{url}/_stub/reset', method='POST')).close()
+    latencies = []
+    lock = threading.Lock()
+    per_thread = calls // threads
+
+    def worker():
+        mine = []
+        for _ in range(per_thread):
+            t0 = time.perf_counter()
+            stripe.checkout.Session.create(
+                payment_method_types=['card'], line_items=LINE_ITEMS, mode='payment',
+                success_url='http://localhost/success', cancel_url='http://localhost/cart',
+                metadata={'order_id': '1'})
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    stats = _stats(url)
+    print(f"{label:>8}: {len(latencies) / elapsed:8.1f} sessions/s  "
+          f"p50 {statistics.median(latencies) * 1000:6.1f} ms  "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:6.1f} ms  "
+          f"connections {stats['connections']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stub-url', help='use a running stub instead of starting one')
+    parser.add_argument('--calls', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=20, help='ms per request (in-process stub)')
+    parser.add_argument('--connect-latency', type=float, default=30, help='ms per new connection (in-process stub)')
+    args = parser.parse_args()
+
+    url = args.stub_url
+    if not url:
+        _, url, _ = stripe_stub.start(latency=args.latency / 1000, connect_latency=args.connect_latency / 1000)
+    print(f'{args.calls} checkout sessions, {args.threads} threads, stub {url}')
+    run('fresh', FreshConnectionClient(timeout=(stripe_client.CONNECT_TIMEOUT, stripe_client.READ_TIMEOUT)),
+        url, args.calls, args.threads)
+    run('pooled', stripe_client.build_http_client(pool_size=args.threads), url, args.calls, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+scripts/reconcile_payments.py
+
+Re-check pending orders with Stripe / Airtel and apply what they report
+(see backend/app/reconcile.py).
+
+Usage:
+  python scripts/reconcile_payments.py                         # orders pending > 15 min
+  python scripts/reconcile_payments.py --min-age 0 --concurrency 16 --batch 500
+  python scripts/reconcile_payments.py --no-airtel             # Stripe orders only
+
+Against the local stubs (scripts/stripe_stub.py, scripts/airtel_stub.py):
+  STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_stub \\
+  AIRTEL_BASE_URL=http://127.0.0.1:12112 python scripts/reconcile_payments.py --min-age 0
+
+Run it periodically (cron) or after an outage; it is safe to run repeatedly.
+"""
+import argparse
+import sys
+from datetime import timedelta
+
+from backend.app import create_app, reconcile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', type=int, default=reconcile.BATCH_SIZE)
+    parser.add_argument('--concurrency', type=int, default=reconcile.CONCURRENCY)
+    parser.add_argument('--min-age', type=int, default=int(reconcile.MIN_AGE.total_seconds()),
+                        help='seconds an order must have been pending')
+    parser.add_argument('--limit', type=int, help='stop after this many orders')
+    parser.add_argument('--no-airtel', action='store_true', help='only check orders with a Stripe session')
+    parser.add_argument('--quiet', action='store_true', help='no per-page progress')
+    args = parser.parse_args()
+
+    def progress(m):
+        print(f"[INFO] scanned {m['scanned']} ({m['scanned_per_second']:.0f}/s), "
+              f"updated {m['updated']}, errors {m['errors']}")
+
+    app = create_app()
+    with app.app_context():
+        m = reconcile.reconcile(batch_size=args.batch, concurrency=args.concurrency,
+                                min_age=timedelta(seconds=args.min_age), limit=args.limit,
+                                use_airtel=not args.no_airtel, report=None if args.quiet else progress)
+    print(f"Scanned {m['scanned']} pending order(s) in {m['elapsed']:.2f}s ({m['scanned_per_second']:.0f}/s): "
+          f"checked {m['checked']}, updated {m['updated']}, unchanged {m['unchanged']}, errors {m['errors']}")
+    if m['errors']:
+        print(f"First error: {m['first_error']}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
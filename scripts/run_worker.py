@@ -0,0 +1,35 @@
+"""
+scripts/run_worker.py
+
+Run the background job worker (Stripe checkout sessions, catalog sync, webhook inbox).
+
+Usage:
+  python scripts/run_worker.py                 # run until Ctrl+C / SIGTERM
+  python scripts/run_worker.py --threads 4     # four jobs in flight at once
+  python scripts/run_worker.py --once          # drain ready jobs and exit
+
+Uses the same DATABASE_URL / .env as the Flask app. Run as many worker
+processes as you like; jobs are claimed with a visibility timeout
+(JOB_VISIBILITY_TIMEOUT seconds), so each job is worked on by one at a time.
+"""
+import argparse
+
+from backend.app import create_app, jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=1, help='jobs processed concurrently')
+    parser.add_argument('--batch', type=int, default=1, help='jobs claimed per poll and thread')
+    parser.add_argument('--idle-sleep', type=float, default=0.5, help='seconds between polls when idle')
+    parser.add_argument('--once', action='store_true', help='exit when no job is ready')
+    args = parser.parse_args()
+
+    app = create_app()
+    print(f'Worker started with {args.threads} thread(s)')
+    counts = jobs.work(app, batch=args.batch, idle_sleep=args.idle_sleep, threads=args.threads, once=args.once)
+    print('Worker stopped: ' + ', '.join(f'{k}={v}' for k, v in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
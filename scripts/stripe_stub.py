@@ -0,0 +1,257 @@
+"""
+scripts/stripe_stub.py
+
+A small local stand-in for the Stripe API, for offline benchmarks and tests.
+
+Implements just what the backend uses:
+  POST /v1/checkout/sessions          GET /v1/checkout/sessions/<id>
+  POST /v1/products[/<id>]            GET /v1/products/<id>
+  POST /v1/prices[/<id>]              GET /v1/prices/<id>
+plus GET /_stub/stats (request and TCP connection counts), POST /_stub/reset
+and POST /_stub/checkout/sessions/<id>/{pay,expire} (what the customer would
+do on the hosted page).
+Idempotency-Key headers are honoured like Stripe does (same key -> same response).
+
+Usage:
+  python scripts/stripe_stub.py --port 12111 --latency 50 --connect-latency 30
+
+then run the backend with:
+  STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_stub
+
+--latency is added to every request (Stripe's processing time) and
+--connect-latency to every new connection (TCP + TLS handshake), which is
+what connection pooling saves.
+"""
+import argparse
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+def decode_form(body):
+    """Decode Stripe's form encoding (a[b][0][c]=v) into nested dicts/lists."""
+    root = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = key.replace(']', '').split('[')
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def listify(node):
+        if not isinstance(node, dict):
+            return node
+        if node and all(k.isdigit() for k in node):
+            return [listify(node[k]) for k in sorted(node, key=int)]
+        return {k: listify(v) for k, v in node.items()}
+
+    return listify(root)
+
+
+class StubState:
+    def __init__(self, latency=0.0, connect_latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.ids = itertools.count(1)
+            self.objects = {}        # id -> object
+            self.idempotent = {}     # (method, path, key) -> (status, body)
+            self.stats = {'connections': 0, 'requests': 0, 'errors': 0, 'by_path': {}}
+
+    def new_id(self, prefix):
+        with self.lock:
+            return f'{prefix}_stub{next(self.ids)}'
+
+
+def _object(state, prefix, kind, params):
+    obj = dict(params)
+    obj['id'] = state.new_id(prefix)
+    obj['object'] = kind
+    obj['created'] = int(time.time())
+    obj.setdefault('metadata', {})
+    if kind in ('product', 'price'):
+        obj['active'] = str(obj.get('active', 'true')).lower() != 'false'
+    if kind == 'price':
+        obj['unit_amount'] = int(obj.get('unit_amount', 0))
+        obj['type'] = 'recurring' if 'recurring' in obj else 'one_time'
+    if kind == 'checkout.session':
+        obj['url'] = f"https://checkout.stripe.test/c/pay/{obj['id']}"
+        obj['payment_status'] = 'unpaid'
+        obj['status'] = 'open'
+        lines = obj.get('line_items', [])
+        total = 0
+        for line in lines:
+            qty = int(line.get('quantity', 1))
+            if 'price' in line:
+                price = state.objects.get(line['price'])
+                if price is None:
+                    return None, f"No such price: '{line['price']}'"
+                total += price['unit_amount'] * qty
+            else:
+                total += int(line.get('price_data', {}).get('unit_amount', 0)) * qty
+        obj['amount_total'] = total
+    state.objects[obj['id']] = obj
+    return obj, None
+
+
+ROUTES = {'checkout/sessions': ('cs', 'checkout.session'), 'products': ('prod', 'product'), 'prices': ('price', 'price')}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive, so client pooling is measurable
+
+        def setup(self):
+            super().setup()
+            # headers and body go out as separate writes; don't let Nagle hold the body
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with state.lock:
+                state.stats['connections'] += 1
+            if state.connect_latency:
+                time.sleep(state.connect_latency)
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Request-Id', f'req_stub{int(time.time() * 1000)}')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message, kind='invalid_request_error'):
+            self._send(status, {'error': {'type': kind, 'message': message}})
+
+        def _route(self):
+            path = urlsplit(self.path).path
+            for prefix, spec in ROUTES.items():
+                base = f'/v1/{prefix}'
+                if path == base:
+                    return spec, None
+                if path.startswith(base + '/') and '/' not in path[len(base) + 1:]:
+                    return spec, path[len(base) + 1:]
+            return (None, None), None
+
+        def _handle(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length).decode('utf-8') if length else ''
+            path = urlsplit(self.path).path
+            with state.lock:
+                state.stats['requests'] += 1
+                state.stats['by_path'][path] = state.stats['by_path'].get(path, 0) + 1
+
+            if path == '/_stub/stats':
+                return self._send(200, state.stats)
+            if path == '/_stub/reset':
+                state.reset()
+                return self._send(200, {'ok': True})
+            if path.startswith('/_stub/checkout/sessions/'):
+                return self._send(*self._settle(path[len('/_stub/checkout/sessions/'):]))
+
+            if state.latency:
+                time.sleep(state.latency)
+            if state.error_rate and random.random() < state.error_rate:
+                with state.lock:
+                    state.stats['errors'] += 1
+                return self._error(500, 'stub injected error', 'api_error')
+            if not (self.headers.get('Authorization') or '').startswith('Bearer '):
+                return self._error(401, 'No API key provided.', 'authentication_error')
+
+            key = self.headers.get('Idempotency-Key')
+            ikey = (method, path, key) if key and method == 'POST' else None
+            if ikey:
+                with state.lock:
+                    cached = state.idempotent.get(ikey)
+                if cached is not None:
+                    return self._send(*cached)
+
+            (prefix, kind), obj_id = self._route()
+            if kind is None:
+                return self._error(404, f'Unrecognized request URL ({method}: {path})')
+            params = decode_form(body)
+            if method == 'GET':
+                obj = state.objects.get(obj_id) if obj_id else None
+                if obj is None:
+                    return self._error(404, f"No such {kind}: '{obj_id}'")
+                return self._send(200, obj)
+            if obj_id:
+                obj = state.objects.get(obj_id)
+                if obj is None:
+                    return self._error(404, f"No such {kind}: '{obj_id}'")
+                if 'active' in params:
+                    params['active'] = str(params['active']).lower() != 'false'
+                obj['metadata'].update(params.pop('metadata', None) or {})
+                obj.update(params)
+                result = (200, obj)
+            else:
+                obj, error = _object(state, prefix, kind, params)
+                result = (400, {'error': {'type': 'invalid_request_error', 'message': error}}) if error else (200, obj)
+            if ikey:
+                with state.lock:
+                    state.idempotent[ikey] = result
+            return self._send(*result)
+
+        def _settle(self, rest):
+            session_id, _, action = rest.partition('/')
+            with state.lock:
+                session = state.objects.get(session_id)
+                if session is None or session['object'] != 'checkout.session':
+                    return 404, {'error': {'type': 'invalid_request_error', 'message': f"No such checkout.session: '{session_id}'"}}
+                if action == 'pay':
+                    session.update(status='complete', payment_status='paid')
+                elif action == 'expire':
+                    session.update(status='expired')
+                else:
+                    return 404, {'error': {'type': 'invalid_request_error', 'message': f'Unknown action {action!r}'}}
+            return 200, session
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+    return Handler
+
+
+def start(port=0, latency=0.0, connect_latency=0.0, error_rate=0.0):
+    """Start the stub on a background thread; returns (server, base_url, state)."""
+    state = StubState(latency, connect_latency, error_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stripe-stub', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}', state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--latency', type=float, default=0, help='ms added to every request')
+    parser.add_argument('--connect-latency', type=float, default=0, help='ms added to every new connection')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with a 500')
+    args = parser.parse_args()
+
+    server, url, _ = start(args.port, args.latency / 1000, args.connect_latency / 1000, args.error_rate)
+    print(f'Stripe stub listening on {url} (STRIPE_API_BASE={url})')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+scripts/sync_stripe_catalog.py
+
+Push menu items (and their promotional prices) to Stripe Products/Prices.
+
+Usage:
+  python scripts/sync_stripe_catalog.py            # only items changed since the last sync
+  python scripts/sync_stripe_catalog.py --full     # re-push every item
+
+Against the local stub (scripts/stripe_stub.py):
+  STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_stub python scripts/sync_stripe_catalog.py
+
+Admin edits also queue this sync on the job queue (scripts/run_worker.py).
+"""
+import argparse
+import sys
+
+from backend.app import create_app, stripe_sync
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--full', action='store_true', help='push every item, not just changed ones')
+    parser.add_argument('--batch', type=int, default=stripe_sync.BATCH_SIZE)
+    parser.add_argument('--concurrency', type=int, default=stripe_sync.CONCURRENCY)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            result = stripe_sync.sync_catalog(full=args.full, batch_size=args.batch, concurrency=args.concurrency)
+        except stripe_sync.SyncError as e:
+            print(f'Sync incomplete: {e}')
+            sys.exit(1)
+    print(f"Checked {result['checked']} item(s), synced {result['synced']}")
+
+
+if __name__ == '__main__':
+    main()